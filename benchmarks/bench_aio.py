@@ -0,0 +1,88 @@
+''' Local load test of AsyncPostgresParser. Concurrent clients send the queries of
+    the benchmark corpus (small OLTP selects mixed with large reporting and IN list
+    queries) and wait for their lineage, as the handlers of a web service would.
+    A heartbeat task measures how long the event loop is stalled. Parsing directly
+    on the event loop is measured too, for comparison.
+
+    Run with: python -m benchmarks.bench_aio [clients] [requests per client]
+'''
+import asyncio
+import os
+import random
+import sys
+import time
+
+from benchmarks.corpus import corpus
+from sqlsense.postgres.postgres_aio import AsyncPostgresParser
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def workload():
+    sql_texts = corpus('oltp', scale=0.1) + corpus('reporting', scale=0.25) + corpus('in_list', scale=0.25)
+    random.Random(0).shuffle(sql_texts)
+    return sql_texts
+
+
+async def heartbeat(lags, interval=0.001):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def client(parse, sql_texts, requests, latencies, errors):
+    for i in range(requests):
+        # Requests arrive through the event loop
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        try:
+            await parse(sql_texts[i % len(sql_texts)])
+        except asyncio.TimeoutError:
+            errors.append(i)
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(parse, sql_texts, clients, requests):
+    (latencies, errors, lags) = ([], [], [])
+    ticker = asyncio.ensure_future(heartbeat(lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(parse, sql_texts[i::clients], requests, latencies, errors) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+    return elapsed, sorted(latencies), errors, max(lags or [0.0])
+
+
+def report(name, elapsed, latencies, errors, max_lag):
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e3
+
+    print('  {0:<24} {1:8.0f} req/s  p50 {2:7.2f} ms  p95 {3:7.2f} ms  p99 {4:7.2f} ms  '
+          'timeouts {5:>4}  max loop stall {6:7.2f} ms'.format(
+              name, len(latencies) / elapsed, percentile(0.5), percentile(0.95), percentile(0.99),
+              len(errors), max_lag * 1e3))
+
+
+async def main(clients, requests):
+    sql_texts = workload()
+    workers = os.cpu_count() or 1
+    print('{0} clients x {1} requests, {2} CPUs'.format(clients, requests, workers))
+
+    parser = PostgresParser()
+
+    async def blocking_parse(sql_text):
+        return [stmt.datafields_involved() for stmt in parser.parse(sql_text)]
+
+    report('blocking', *await load(blocking_parse, sql_texts, clients, requests))
+    for (name, processes) in (('threads', False), ('processes', True)):
+        async with AsyncPostgresParser(workers=workers, processes=processes, timeout=10) as async_parser:
+            async def async_parse(sql_text):
+                return await async_parser.parse(sql_text, lineage=True)
+
+            # Workers start and warm up before being measured
+            await asyncio.gather(*(async_parse(sql_text) for sql_text in sql_texts[:workers]))
+            report(name, *await load(async_parse, sql_texts, clients, requests))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 20))
@@ -0,0 +1,55 @@
+''' Parse time of a query log with and without ParseCache, where 95% of the
+    queries repeat a query shape already seen (with other literal values).
+
+    Run with: python -m benchmarks.bench_cache [count]
+'''
+import random
+import sys
+import time
+
+from sqlsense.cache import ParseCache
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+QUERY_SHAPES = [
+    "SELECT o.id, o.total, c.name FROM shop.orders o JOIN shop.customers c ON o.customer_id = c.id "
+    "WHERE o.created_at > '{date}' AND o.total >= {amount} ORDER BY o.created_at DESC LIMIT {limit};",
+    "SELECT upper(p.code) AS code, p.price * {amount} price FROM shop.products p "
+    "WHERE p.category IN ({number}, {limit}) AND p.name LIKE '{word}%';",
+    "SELECT s.* FROM (SELECT a, b FROM sch.t{table} WHERE c = {number}) s WHERE s.b <> '{word}';",
+]
+
+
+def query_log(count, repeat_rate=0.95, seed=1):
+    rnd = random.Random(seed)
+    queries = []
+    for index in range(count):
+        # Queries on new tables have a shape not seen before
+        table = rnd.randrange(10) if rnd.random() < repeat_rate else 10 + index
+        queries.append(rnd.choice(QUERY_SHAPES).format(
+            date='2020-0{0}-1{1}'.format(rnd.randint(1, 9), rnd.randint(0, 9)), amount=rnd.random() * 1000,
+            limit=rnd.randint(1, 500), number=rnd.randint(1, 10 ** 6), table=table,
+            word=''.join(rnd.choice('abcdefgh') for _ in range(rnd.randint(1, 12)))))
+    return queries
+
+
+def run(parse, queries):
+    start = time.perf_counter()
+    for sql_text in queries:
+        for stmt in parse(sql_text):
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    queries = query_log(count)
+    parser = PostgresParser()
+    cache = ParseCache(parser)
+    uncached = run(parser.parse, queries)
+    cached = run(cache.parse, queries)
+    print('{0} queries: parse {1:.2f} s, cached parse {2:.2f} s ({3:.1f}x), {4}'.format(
+        count, uncached, cached, uncached / cached, cache.cache_info()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+''' Parse time of statements with nested CASE expressions and conditions in
+    the WHERE clause, at growing nesting depths. Most tokens of these statements
+    make the parser climb out of Token Groups to the enclosing condition or
+    expression, the climbs per token are reported along with the time.
+
+    Run with: python -m benchmarks.bench_climbing
+'''
+import time
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def nested_case(depth):
+    expression = 'c0'
+    for i in range(1, depth + 1):
+        expression = ('CASE WHEN t.c{0} > {0} AND (t.d{0} = {0} OR t.e{0} IN (1, 2)) AND NOT t.f{0} = 0 '
+                      'THEN {1} ELSE t.c{0} + {0} END').format(i, expression)
+    return 'SELECT t.a FROM t WHERE t.b = {0} AND t.c = 1 OR t.d BETWEEN 1 AND 2'.format(expression)
+
+
+def main(repeat=5):
+    parser = PostgresParser()
+    for depth in (10, 50, 100, 200):
+        sql_text = nested_case(depth)
+        stats = parser.enable_profiling()
+        list(parser.parse(sql_text))
+        parser.disable_profiling()
+        climbs = sum(rule_stats.climbs for rule_stats in stats.rules.values()) + stats.closing_climbs
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(parser.parse(sql_text))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print('  depth {0:>4} ({1:>6} tokens, {2:.2f} climbs/token): {3:8.3f} ms {4:6.2f} us/token'.format(
+            depth, stats.tokens, climbs / stats.tokens, best * 1e3, best / stats.tokens * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+''' Time of Statement.get_identifiers on wide SELECT lists.
+
+    Run with: python -m benchmarks.bench_identifiers
+'''
+import timeit
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def wide_select(columns):
+    return 'SELECT {0} FROM wide_table t;'.format(
+        ', '.join('t.col_{0} AS c{0}, t.a + {0} x{0}'.format(i) for i in range(columns)))
+
+
+def main():
+    parser = PostgresParser()
+    for columns in (100, 1000, 10000):
+        stmt = list(parser.parse(wide_select(columns)))[0]
+        count = sum(1 for _ in stmt.flatten())
+        number = max(1, 100000 // count)
+        elapsed = min(timeit.repeat(lambda: sum(1 for _ in stmt.get_identifiers()), number=number, repeat=5)) / number
+        print('  {0:>6} columns ({1:>6} tokens): {2:8.3f} ms  {3:6.3f} us/token'.format(
+            columns * 2, count, elapsed * 1e3, elapsed / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
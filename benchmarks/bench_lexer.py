@@ -0,0 +1,34 @@
+''' Lexing time of the Pygments PostgresLexer and of PostgresFastLexer,
+    with and without the filters added by PostgresParser, and the parse time
+    of PostgresParser using each of them.
+
+    Run with: python -m benchmarks.bench_lexer
+'''
+import timeit
+
+from pygments.lexers.sql import PostgresLexer
+
+from sqlsense.postgres.postgres_lexer import PostgresFastLexer
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.sql_corpus import sql_texts
+
+
+def best_of(function, repeat=5):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    sql_text = ';\n'.join(sql_texts()) * 20
+    print('{0} characters'.format(len(sql_text)))
+    for lexer_class in (PostgresLexer, PostgresFastLexer):
+        parser = PostgresParser(lexer_object=lexer_class)
+        lexer = lexer_class(stripall=True)
+        unprocessed = best_of(lambda: sum(1 for _ in lexer.get_tokens_unprocessed(sql_text)))
+        filtered = best_of(lambda: sum(1 for _ in parser._lexer.get_tokens(sql_text)))
+        parse = best_of(lambda: sum(1 for _ in parser.parse(sql_text)))
+        print('  {0:<18} lex {1:6.3f} s  lex + filters {2:6.3f} s  parse {3:6.3f} s'.format(
+            lexer_class.__name__, unprocessed, filtered, parse))
+
+
+if __name__ == '__main__':
+    main()
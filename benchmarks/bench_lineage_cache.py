@@ -0,0 +1,41 @@
+''' Lineage of the benchmark corpus through LineageCache, as a nightly crawl would
+    get it: the first run parses and stores every statement, the next runs find
+    them in the cache. Parsing without the cache is measured for comparison.
+
+    Run with: python -m benchmarks.bench_lineage_cache
+'''
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import CATEGORIES, corpus
+from sqlsense.batch import lineage_records
+from sqlsense.lineage_cache import LineageCache
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def timed(function, sql_texts):
+    start = time.perf_counter()
+    for sql_text in sql_texts:
+        function(sql_text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = PostgresParser()
+    sql_texts = [sql_text for category in CATEGORIES for sql_text in corpus(category, scale=0.25)]
+    print('{0} SQL texts'.format(len(sql_texts)))
+    print('  no cache  : {0:8.3f} s'.format(
+        timed(lambda sql_text: [lineage_records(stmt) for stmt in parser.parse(sql_text)], sql_texts)))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'lineage.db')
+        with LineageCache(path, parser) as cache:
+            print('  cold cache: {0:8.3f} s'.format(timed(cache.lineage, sql_texts)))
+        # A new instance, as the next run of the crawl (or another worker process) opens it
+        with LineageCache(path, PostgresParser()) as cache:
+            print('  warm cache: {0:8.3f} s  {1}'.format(timed(cache.lineage, sql_texts), cache.cache_info()))
+        print('  database  : {0:8.0f} KB'.format(os.path.getsize(path) / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+''' Memory used by parsed statement trees, in bytes per input character.
+
+    Run with: python -m benchmarks.bench_memory
+'''
+import gc
+import tracemalloc
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def etl_statement(target_size=50000):
+    ''' Builds a wide INSERT ... SELECT style ETL statement of roughly target_size characters.
+    '''
+    columns = []
+    i = 0
+    while sum(len(c) for c in columns) < target_size:
+        columns.append(
+            "\n    -- column {0}\n    coalesce(s.col_{0}, 0) + d.adj_{0} AS out_{0}, CASE WHEN s.flag_{0} = 'Y' THEN 1 ELSE 0 END".format(i))
+        i += 1
+    return ('SELECT ' + ',\n'.join(columns) +
+            '\nFROM staging.src s JOIN dims.adjust d ON s.id = d.id\nWHERE s.load_dt >= 20200101;\n')
+
+
+def measure(sql_text):
+    parser = PostgresParser()
+    gc.collect()
+    tracemalloc.start()
+    statements = list(parser.parse(sql_text))
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del statements
+    return retained, peak
+
+
+def main():
+    for size in (5000, 50000):
+        sql_text = etl_statement(size)
+        retained, peak = measure(sql_text)
+        print('{0:>7} chars: retained {1:>10} bytes ({2:6.1f} B/char), peak {3:>10} bytes ({4:6.1f} B/char)'.format(
+            len(sql_text), retained, retained / len(sql_text), peak, peak / len(sql_text)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+''' Time to walk (flatten, get_identifiers, value) statements with nested
+    sub queries and CASE expressions, at growing nesting depths. The walks
+    use an explicit stack, so the time per token stays flat as the depth grows
+    and deep nesting does not raise RecursionError.
+
+    Run with: python -m benchmarks.bench_nesting
+'''
+import sys
+import time
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def nested_subqueries(depth):
+    sql_text = 'SELECT x.a FROM t x'
+    for i in range(depth):
+        sql_text = 'SELECT s{0}.a, CASE WHEN s{0}.a > {0} THEN 1 ELSE 0 END b FROM ({1}) s{0}'.format(i, sql_text)
+    return sql_text
+
+
+def time_walk(walk, count):
+    start = time.perf_counter()
+    walk()
+    elapsed = time.perf_counter() - start
+    return '{0:7.3f} ms {1:6.2f} us/token'.format(elapsed * 1e3, elapsed / count * 1e6)
+
+
+def main():
+    parser = PostgresParser()
+    print('Recursion limit: {0}'.format(sys.getrecursionlimit()))
+    for depth in (50, 100, 200, 400, 800):
+        stmt = list(parser.parse(nested_subqueries(depth)))[0]
+        count = sum(1 for _ in stmt.flatten())
+        # Drop the values cached while parsing
+        for token in stmt.get_identifiers():
+            token._invalidate_value()
+        print('  depth {0:>4} ({1:>6} tokens):'.format(depth, count))
+        print('    value           {0}'.format(time_walk(stmt.value, count)))
+        print('    flatten         {0}'.format(time_walk(lambda: sum(1 for _ in stmt.flatten()), count)))
+        print('    get_identifiers {0}'.format(time_walk(lambda: sum(1 for _ in stmt.get_identifiers()), count)))
+
+
+if __name__ == '__main__':
+    main()
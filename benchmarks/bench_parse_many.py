@@ -0,0 +1,33 @@
+''' Throughput of PostgresParser.parse_many with 1 to N worker processes.
+
+    Run with: python -m benchmarks.bench_parse_many [max_workers]
+'''
+import os
+import sys
+import time
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def statements(count):
+    return ['SELECT t{0}.a, upper(t{0}.b) AS b, t{0}.c + u.d cd FROM sch.t{0} t{0} JOIN u ON t{0}.id = u.id '
+            'WHERE t{0}.x IN (1, 2, 3) AND u.y LIKE \'a%\';'.format(i % 50) for i in range(count)]
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    sql_texts = statements(4000)
+    parser = PostgresParser()
+    print('{0} statements, {1} CPUs'.format(len(sql_texts), os.cpu_count()))
+    for workers in range(1, max_workers + 1):
+        for lineage in (False, True):
+            start = time.perf_counter()
+            for _ in parser.parse_many(sql_texts, workers=workers, chunksize=64, lineage=lineage):
+                pass
+            elapsed = time.perf_counter() - start
+            print('  workers={0:<3} lineage={1!s:<5}: {2:7.2f} s  {3:8.0f} statements/s'.format(
+                workers, lineage, elapsed, len(sql_texts) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
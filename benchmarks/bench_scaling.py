@@ -0,0 +1,56 @@
+''' Parse time of wide SELECT lists and long IN lists, and the time to merge
+    a long run of tokens into a new group, at growing sizes.
+    With linear scaling the time per item stays flat as the size grows.
+
+    Run with: python -m benchmarks.bench_scaling
+'''
+import time
+
+from pygments import token as T
+
+import sqlsense.tokens as ST
+from sqlsense.postgres.postgres_parser import PostgresParser
+from sqlsense.sql import Token, TokenGroup
+
+
+def wide_select(columns):
+    return 'SELECT {0} FROM wide_table t;'.format(', '.join('t.col_{0} AS c{0}'.format(i) for i in range(columns)))
+
+
+def long_in_list(elements):
+    return 'SELECT t.id FROM t WHERE t.id IN ({0});'.format(', '.join(str(i) for i in range(elements)))
+
+
+def time_parse(parser, sql_text):
+    start = time.perf_counter()
+    for _ in parser.parse(sql_text):
+        pass
+    return time.perf_counter() - start
+
+
+def report(title, builder, sizes):
+    parser = PostgresParser()
+    print(title)
+    for size in sizes:
+        elapsed = time_parse(parser, builder(size))
+        print('  {0:>7} items: {1:8.3f} s  {2:7.2f} us/item'.format(size, elapsed, elapsed / size * 1e6))
+
+
+def report_merge(sizes):
+    print('merge_into_token_group of all but the first child')
+    for size in sizes:
+        token_group = TokenGroup([Token(T.Name, 'c{0}'.format(i)) for i in range(size)], ST.SelectClause)
+        start = time.perf_counter()
+        token_group.merge_into_token_group(ST.ComputedIdentifier, token_list_start_index_included=1)
+        elapsed = time.perf_counter() - start
+        print('  {0:>7} items: {1:8.3f} s  {2:7.2f} us/item'.format(size, elapsed, elapsed / size * 1e6))
+
+
+def main():
+    report('SELECT list', wide_select, (1250, 2500, 5000, 10000))
+    report('IN (...) list', long_in_list, (12500, 25000, 50000, 100000))
+    report_merge((25000, 50000, 100000, 200000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+''' Parse time of wide statements (thousands of SELECT items, IN list values
+    and ORDER BY items), at growing widths. The time per token should stay
+    flat as the width grows.
+
+    Run with: python -m benchmarks.bench_wide
+'''
+import time
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def wide_statement(width):
+    items = ',\n    '.join('t.c{0} AS a{0} '.format(i) for i in range(width))
+    values = ', '.join('{0} '.format(i) for i in range(width))
+    order_by = ', '.join('a{0} '.format(i) for i in range(width))
+    return 'SELECT {0}\nFROM t\nWHERE t.k IN ({1})\nORDER BY {2}'.format(items, values, order_by)
+
+
+def main(repeat=3):
+    parser = PostgresParser()
+    for width in (500, 1000, 2000, 4000, 8000, 16000):
+        sql_text = wide_statement(width)
+        count = sum(1 for stmt in parser.parse(sql_text) for _ in stmt.flatten())
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(parser.parse(sql_text))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print('  width {0:>6} ({1:>7} tokens): {2:9.3f} ms {3:6.2f} us/token'.format(
+            width, count, best * 1e3, best / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
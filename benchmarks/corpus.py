@@ -0,0 +1,123 @@
+''' Reproducible query corpus for the benchmarks. Every category is generated
+    from a seeded random number generator, the same seed giving the same SQL text.
+'''
+import random
+
+TABLES = ['orders', 'customers', 'products', 'order_items', 'payments', 'shipments', 'suppliers', 'stores']
+SCHEMAS = ['sales', 'crm', 'inventory', 'finance']
+
+
+def _column(rnd):
+    return rnd.choice(['id', 'status', 'amount', 'created_at', 'updated_at', 'name', 'code', 'qty', 'price'])
+
+
+def _table(rnd):
+    return '{0}.{1}'.format(rnd.choice(SCHEMAS), rnd.choice(TABLES))
+
+
+def _literal(rnd):
+    if rnd.random() < 0.5:
+        return str(rnd.randint(1, 100000))
+    return "'{0}'".format(''.join(rnd.choice('abcdefghij') for _ in range(rnd.randint(1, 10))))
+
+
+def oltp_select(rnd):
+    ''' Short primary key / foreign key lookup.
+    '''
+    return 'SELECT t.{0}, t.{1}, t.{2} FROM {3} t WHERE t.id = {4} AND t.{5} = {6};'.format(
+        _column(rnd), _column(rnd), _column(rnd), _table(rnd), rnd.randint(1, 10 ** 6), _column(rnd), _literal(rnd))
+
+
+def reporting_select(rnd, columns=60, joins=6):
+    ''' Wide reporting query with functions, CASE expressions, joins and grouping.
+    '''
+    aliases = ['t{0}'.format(i) for i in range(joins + 1)]
+    select_list = []
+    for i in range(columns):
+        alias = rnd.choice(aliases)
+        kind = rnd.randint(0, 3)
+        if kind == 0:
+            select_list.append('{0}.{1} AS c{2}'.format(alias, _column(rnd), i))
+        elif kind == 1:
+            select_list.append('upper({0}.{1}) c{2}'.format(alias, _column(rnd), i))
+        elif kind == 2:
+            select_list.append('{0}.{1} * {2} + {0}.{3} AS c{4}'.format(alias, _column(rnd), rnd.randint(2, 9), _column(rnd), i))
+        else:
+            select_list.append("CASE WHEN {0}.{1} > {2} THEN 'high' ELSE 'low' END AS c{3}".format(
+                alias, _column(rnd), rnd.randint(1, 100), i))
+    from_clause = '{0} t0'.format(_table(rnd))
+    for i in range(1, joins + 1):
+        from_clause += '\n  LEFT JOIN {0} t{1} ON t{1}.id = t{2}.{3}'.format(_table(rnd), i, rnd.randrange(i), _column(rnd))
+    return ('SELECT {0}\nFROM {1}\nWHERE t0.created_at >= {2} AND t0.status <> {3}\n'
+            'GROUP BY t0.id, t1.id\nORDER BY t0.id;').format(
+                ',\n  '.join(select_list), from_clause, _literal(rnd), _literal(rnd))
+
+
+def nested_select(rnd, depth=40):
+    ''' Sub queries nested depth levels deep, with a CASE expression at each level.
+    '''
+    sql_text = 'SELECT x.{0} FROM {1} x'.format(_column(rnd), _table(rnd))
+    for i in range(depth):
+        sql_text = 'SELECT s{0}.{1}, CASE WHEN s{0}.{1} > {2} THEN 1 ELSE 0 END b{0} FROM ({3}) s{0}'.format(
+            i, _column(rnd), rnd.randint(1, 100), sql_text)
+    return sql_text + ';'
+
+
+def in_list_select(rnd, elements=1000):
+    ''' Lookup of a large list of keys.
+    '''
+    return 'SELECT t.id, t.{0} FROM {1} t WHERE t.id IN ({2});'.format(
+        _column(rnd), _table(rnd), ', '.join(str(rnd.randint(1, 10 ** 7)) for _ in range(elements)))
+
+
+def union_select(rnd, selects=40):
+    ''' Long chain of UNION / UNION ALL.
+    '''
+    parts = ['SELECT t{0}.id, t{0}.{1} FROM {2} t{0} WHERE t{0}.{3} = {4}'.format(
+        i, _column(rnd), _table(rnd), _column(rnd), _literal(rnd)) for i in range(selects)]
+    sql_text = parts[0]
+    for part in parts[1:]:
+        sql_text += '\nUNION ALL\n' if rnd.random() < 0.7 else '\nUNION\n'
+        sql_text += part
+    return sql_text + ';'
+
+
+def etl_with_select(rnd, ctes=12):
+    ''' WITH heavy ETL query, each CTE reading the previous one.
+    '''
+    cte_list = ['stage0 AS (SELECT s.id, s.{0}, s.{1} FROM {2} s WHERE s.{3} IS NOT NULL)'.format(
+        _column(rnd), _column(rnd), _table(rnd), _column(rnd))]
+    for i in range(1, ctes):
+        cte_list.append(
+            'stage{0} AS (SELECT p.id, upper(p.{1}) AS {1}, p.{2} + d.{3} AS v{0} FROM stage{4} p '
+            'JOIN {5} d ON d.id = p.id WHERE d.{6} > {7})'.format(
+                i, _column(rnd), _column(rnd), _column(rnd), i - 1, _table(rnd), _column(rnd), rnd.randint(1, 1000)))
+    return 'WITH {0}\nSELECT f.* FROM stage{1} f;'.format(',\n'.join(cte_list), ctes - 1)
+
+
+CATEGORIES = {
+    'oltp': (oltp_select, 2000),
+    'reporting': (reporting_select, 40),
+    'nesting': (nested_select, 40),
+    'in_list': (in_list_select, 20),
+    'union': (union_select, 40),
+    'etl_with': (etl_with_select, 60),
+}
+
+
+def corpus(category, seed=0, scale=1.0):
+    """ Returns the SQL texts (one statement each) of a category.
+
+    Arguments:
+        category {str} -- [One of CATEGORIES]
+
+    Keyword Arguments:
+        seed {int} -- [Seed of the random number generator] (default: {0})
+        scale {float} -- [Multiplies the number of SQL texts] (default: {1.0})
+
+    Returns:
+        [list] -- [SQL texts]
+    """
+    (generator, count) = CATEGORIES[category]
+    rnd = random.Random('{0}:{1}'.format(category, seed))
+    return [generator(rnd) for _ in range(max(1, int(count * scale)))]
@@ -0,0 +1,142 @@
+''' Parser benchmark suite over the generated query corpus (see benchmarks.corpus).
+
+    For each corpus category it measures PostgresParser.parse, datasets_involved and
+    datafields_involved separately and reports tokens/s, statements/s and the peak
+    memory of parsing. Results can be saved as JSON and compared with saved results,
+    the exit status being 1 when a measure is slower than the saved one by more than
+    the threshold.
+
+    Run with: python -m benchmarks.suite [--repeat N] [--scale S] [--save FILE] [--compare FILE] [--threshold T]
+'''
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import CATEGORIES, corpus
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def best_time(function, repeat, setup=None):
+    """ Returns the best (lowest) time of repeat calls of the function. When given,
+        setup is called (untimed) before each call and returns the arguments of the function.
+    """
+    best = None
+    for _ in range(repeat):
+        arguments = setup() if setup is not None else ()
+        gc.collect()
+        start = time.perf_counter()
+        function(*arguments)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(sql_texts, repeat):
+    """ Returns the measures of a list of SQL texts.
+    """
+    parser = PostgresParser()
+
+    def parse():
+        for sql_text in sql_texts:
+            for _ in parser.parse(sql_text):
+                pass
+
+    def parse_statements():
+        return ([stmt for sql_text in sql_texts for stmt in parser.parse(sql_text)], )
+
+    def datasets(statements):
+        for stmt in statements:
+            stmt.datasets_involved()
+
+    def datafields(statements):
+        for stmt in statements:
+            stmt.datafields_involved()
+
+    statements = parse_statements()[0]
+    token_count = sum(1 for stmt in statements for _ in stmt.flatten())
+    statement_count = len(statements)
+    del statements
+
+    gc.collect()
+    tracemalloc.start()
+    parse_statements()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    parse_time = best_time(parse, repeat)
+    return {
+        'statements': statement_count,
+        'tokens': token_count,
+        'characters': sum(len(sql_text) for sql_text in sql_texts),
+        'parse_s': parse_time,
+        # Lineage is generated once per statement, on fresh statements each time
+        'datasets_involved_s': best_time(datasets, repeat, setup=parse_statements),
+        'datafields_involved_s': best_time(datafields, repeat, setup=parse_statements),
+        'tokens_per_s': token_count / parse_time,
+        'statements_per_s': statement_count / parse_time,
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def compare(results, baseline, threshold):
+    """ Returns the list of (category, measure, baseline value, value) slower
+        (or using more memory) than the baseline by more than the threshold.
+        Measures are compared per token, so that results of different scales can be compared.
+    """
+    regressions = []
+    for category, measures in results.items():
+        baseline_measures = baseline.get(category)
+        if not baseline_measures:
+            continue
+        for measure_name in ('parse_s', 'datasets_involved_s', 'datafields_involved_s', 'peak_memory_bytes'):
+            baseline_value = baseline_measures[measure_name] / baseline_measures['tokens']
+            value = measures[measure_name] / measures['tokens']
+            if value > baseline_value * (1 + threshold):
+                regressions.append((category, measure_name + ' per token', baseline_value, value))
+    return regressions
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description='sqlsense parser benchmark suite')
+    argument_parser.add_argument('--repeat', type=int, default=3, help='runs of each measure, the best is kept')
+    argument_parser.add_argument('--scale', type=float, default=1.0, help='multiplies the size of the corpus')
+    argument_parser.add_argument('--seed', type=int, default=0, help='seed of the corpus')
+    argument_parser.add_argument('--category', action='append', choices=sorted(CATEGORIES),
+                                 help='corpus category to run (default: all)')
+    argument_parser.add_argument('--save', help='save the results to this JSON file')
+    argument_parser.add_argument('--compare', help='compare the results with this JSON file')
+    argument_parser.add_argument('--threshold', type=float, default=0.2,
+                                 help='relative slow down reported as a regression (default: 0.2)')
+    args = argument_parser.parse_args(argv)
+
+    results = {}
+    print('{0:<10} {1:>6} {2:>8} {3:>9} {4:>11} {5:>9} {6:>10} {7:>11} {8:>10}'.format(
+        'category', 'stmts', 'tokens', 'parse s', 'tokens/s', 'stmts/s', 'datasets s', 'datafields s', 'peak MiB'))
+    for category in args.category or list(CATEGORIES):
+        measures = measure(corpus(category, seed=args.seed, scale=args.scale), args.repeat)
+        results[category] = measures
+        print('{0:<10} {1[statements]:>6} {1[tokens]:>8} {1[parse_s]:>9.3f} {1[tokens_per_s]:>11.0f} '
+              '{1[statements_per_s]:>9.1f} {1[datasets_involved_s]:>10.3f} {1[datafields_involved_s]:>11.3f} '
+              '{2:>10.1f}'.format(category, measures, measures['peak_memory_bytes'] / 2 ** 20))
+
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump({'python': sys.version.split()[0], 'results': results}, results_file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for (category, measure_name, baseline_value, value) in regressions:
+            print('REGRESSION {0} {1}: {2:.4g} -> {3:.4g} ({4:+.0%})'.format(
+                category, measure_name, baseline_value, value, value / baseline_value - 1))
+        if regressions:
+            return 1
+        print('No regression (threshold {0:.0%})'.format(args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+''' Parses SQL texts from asyncio code (e.g. a web service) without blocking the
+    event loop. The parsing is done in a pool of worker threads or processes,
+    each worker having its own parser instance.
+'''
+import asyncio
+import codecs
+import collections
+import concurrent.futures
+import itertools
+import os
+import threading
+
+from sqlsense.batch import lineage_records
+from sqlsense.parser import DEFAULT_CHUNK_SIZE
+from sqlsense.serialize import dumps, loads
+
+# Parser instances of the worker thread (or process), by parser class
+_worker = threading.local()
+
+
+def _parse_task(parser_class, sql_text, offset, lineage, serialized):
+    parsers = _worker.__dict__.setdefault('parsers', {})
+    parser = parsers.get(parser_class)
+    if parser is None:
+        parser = parsers[parser_class] = parser_class()
+    statements = list(parser.parse(sql_text))
+    if lineage:
+        return [lineage_records(stmt, offset) for stmt in statements]
+    if serialized:
+        # Pickle fails on deeply nested Statements, see sqlsense.batch._parse_task
+        return dumps(statements)
+    return statements
+
+
+class AsyncParser(object):
+    """ Parses SQL texts in a pool of workers, to be awaited from asyncio code.
+
+        With worker threads (the default) the event loop stays responsive while
+        statements are parsed, the Statements are returned as they are. Worker processes
+        also parse in parallel on several CPUs, but the Statements are serialized back
+        (see sqlsense.serialize): ask for the lineage records instead (lineage=True) when the trees are not needed.
+
+        At most max_pending SQL texts are queued or being parsed at a time, the
+        callers beyond that wait for one of them to be done (backpressure).
+    """
+
+    def __init__(self, parser_class, workers=None, processes=False, executor=None, max_pending=None, timeout=None):
+        """
+        Arguments:
+            parser_class {class} -- [SqlParser sub class, instantiated once per worker]
+
+        Keyword Arguments:
+            workers {int} -- [Number of workers, all the CPUs if None] (default: {None})
+            processes {bool} -- [Worker processes instead of worker threads] (default: {False})
+            executor {concurrent.futures.Executor} -- [Pool of workers to use instead of creating
+            one. It is not shut down by close] (default: {None})
+            max_pending {int} -- [Number of SQL texts queued or being parsed at a time,
+            twice the number of workers if None] (default: {None})
+            timeout {float} -- [Default number of seconds to wait for a result, no limit if None] (default: {None})
+        """
+        self.parser_class = parser_class
+        self.timeout = timeout
+        workers = workers or os.cpu_count() or 1
+        self._own_executor = executor is None
+        if executor is not None:
+            self._executor = executor
+        elif processes:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                                   thread_name_prefix='sqlsense')
+        # Statements are sent back serialized by worker processes
+        self._serialized = isinstance(self._executor, concurrent.futures.ProcessPoolExecutor)
+        self.max_pending = max_pending or 2 * workers
+        # Created on first use, within the running event loop
+        self._slots = None
+        # Parser instance splitting the streams into statements
+        self._parser = parser_class()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """ Shuts the pool of workers down, waiting for the SQL texts being parsed.
+        """
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def parse(self, sql_text, lineage=False, timeout=None):
+        """ Parses the SQL text in a worker.
+
+        Arguments:
+            sql_text {str} -- [SQL text, may hold one or more statements]
+
+        Keyword Arguments:
+            lineage {bool} -- [Return lineage records (see sqlsense.batch.lineage_records)
+            instead of the Statements] (default: {False})
+            timeout {float} -- [Number of seconds to wait for a free slot and the result,
+            the timeout of the instance if None] (default: {None})
+
+        Raises:
+            asyncio.TimeoutError -- [The result was not there in time. A SQL text whose
+            parsing has started is still parsed to the end, its result is dropped]
+
+        Returns:
+            [list] -- [Statements (or lineage records) of the SQL text]
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._parse(sql_text, lineage), timeout)
+
+    async def parse_stream(self, reader, lineage=False, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8',
+                           timeout=None):
+        """ Parses the SQL text read from a stream, e.g. an asyncio.StreamReader or a request body.
+            The statements are parsed by the workers while the stream is being read, and
+            yielded in order. Reading stops while max_pending statements wait to be yielded.
+
+        Arguments:
+            reader {object} -- [Object with a coroutine read(size) returning str or bytes,
+            empty at the end of the stream]
+
+        Keyword Arguments:
+            lineage {bool} -- [Yield lineage records instead of the Statements, their positions
+            are within the complete text] (default: {False})
+            chunk_size {int} -- [Number of characters (or bytes) read at a time] (default: {DEFAULT_CHUNK_SIZE})
+            encoding {str} -- [Encoding of a stream of bytes] (default: {'utf-8'})
+            timeout {float} -- [Number of seconds to wait for the result of each statement,
+            the timeout of the instance if None] (default: {None})
+
+        Yields:
+            [SqlStatement] -- [Parsed Statements (or their lineage records). The source of each
+            Statement is its own text, its positions are relative to that text.]
+        """
+        timeout = self.timeout if timeout is None else timeout
+        splitter = self._parser._get_statement_splitter()
+        decoder = None
+        pending = collections.deque()
+        try:
+            while True:
+                chunk = await reader.read(chunk_size)
+                end_of_stream = not chunk
+                if isinstance(chunk, bytes):
+                    decoder = decoder or codecs.getincrementaldecoder(encoding)()
+                    chunk = decoder.decode(chunk, final=end_of_stream)
+                # The offset of the splitter is the one of the statement text just yielded
+                statement_texts = splitter.feed(chunk)
+                if end_of_stream:
+                    statement_texts = itertools.chain(statement_texts, splitter.close())
+                for statement_text in statement_texts:
+                    while len(pending) >= self.max_pending:
+                        for result in await asyncio.wait_for(pending.popleft(), timeout):
+                            yield result
+                    pending.append(await self._submit(statement_text, splitter.offset, lineage))
+                while pending and pending[0].done():
+                    for result in pending.popleft().result():
+                        yield result
+                if end_of_stream:
+                    break
+            while pending:
+                for result in await asyncio.wait_for(pending.popleft(), timeout):
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _parse(self, sql_text, lineage):
+        return await (await self._submit(sql_text, 0, lineage))
+
+    async def _submit(self, sql_text, offset, lineage):
+        """ Waits for a free slot and hands the SQL text to a worker.
+
+        Returns:
+            [asyncio.Future] -- [Result of the worker]
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        slots = self._slots
+        await slots.acquire()
+        try:
+            serialized = self._serialized and not lineage
+            future = self._executor.submit(_parse_task, self.parser_class, sql_text, offset, lineage, serialized)
+        except BaseException:
+            slots.release()
+            raise
+
+        def release(_):
+            # The slot is freed once the worker is done, even if nobody waits for the result anymore
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(slots.release)
+
+        future.add_done_callback(release)
+        future = asyncio.wrap_future(future, loop=loop)
+        if serialized:
+            return asyncio.ensure_future(self._loaded(future))
+        return future
+
+    async def _loaded(self, future):
+        return loads(await future, self._parser)
@@ -0,0 +1,119 @@
+''' Parses many independent SQL texts using a pool of worker processes,
+    each worker process having its own parser instance.
+'''
+import multiprocessing
+import os
+
+from sqlsense.serialize import dumps, loads
+
+# Parser instance of the worker process, created by _init_worker
+_worker_parser = None
+# True in the worker processes, which return the Statements serialized (see _parse_task)
+_in_worker_process = False
+
+
+def lineage_records(stmt, offset=0):
+    """ Returns the datasets and datafields of a statement as plain records,
+        which can be pickled without the statement tree.
+
+    Arguments:
+        stmt {SqlStatement} -- [Parsed Statement]
+
+    Keyword Arguments:
+        offset {int} -- [Offset added to the positions] (default: {0})
+
+    Returns:
+        [dict] -- [{datasets, datafields} where defined_at of each record holds
+        the (start, end) position of the token instead of the token itself]
+    """
+    def plain(record):
+        record = record._asdict()
+        span = record['defined_at'].span
+        record['defined_at'] = (offset + span[0], offset + span[1]) if span is not None else None
+        return record
+
+    return {
+        'datasets': [plain(dataset) for dataset in stmt.datasets_involved()],
+        'datafields': [plain(datafield) for datafield in stmt.datafields_involved()],
+    }
+
+
+def _init_worker(parser_class):
+    global _worker_parser, _in_worker_process
+    _worker_parser = parser_class()
+    _in_worker_process = True
+
+
+def _parse_task(task):
+    (index, offset, statement_text, lineage) = task
+    statements = list(_worker_parser.parse(statement_text))
+    if lineage:
+        return index, [lineage_records(stmt, offset) for stmt in statements]
+    if _in_worker_process:
+        # Pickle follows the parent back-pointers recursively and fails on deeply
+        # nested Statements, sqlsense.serialize does not (and is smaller)
+        return index, dumps(statements)
+    return index, statements
+
+
+def _tasks(parser, sql_texts, lineage, counter):
+    """ Generator splitting each SQL text into statements, yielding one task per statement.
+        counter[0] holds the number of SQL texts read so far.
+    """
+    for index, sql_text in enumerate(sql_texts):
+        splitter = parser._get_statement_splitter()
+        for statement_text in splitter.feed(sql_text):
+            yield (index, splitter.offset, statement_text, lineage)
+        for statement_text in splitter.close():
+            yield (index, splitter.offset, statement_text, lineage)
+        counter[0] = index + 1
+
+
+def parse_many(parser_class, sql_texts, workers=None, chunksize=16, lineage=False):
+    """ Parses the SQL texts in parallel, yielding the results in input order.
+
+    Arguments:
+        parser_class {class} -- [SqlParser sub class, instantiated once per worker process]
+        sql_texts {iterable} -- [SQL texts, each may hold one or more statements]
+
+    Keyword Arguments:
+        workers {int} -- [Number of worker processes, all the CPUs if None.
+        With 1 worker the texts are parsed in the calling process] (default: {None})
+        chunksize {int} -- [Number of statements sent to a worker at a time] (default: {16})
+        lineage {bool} -- [Return lineage records (see lineage_records) instead
+        of the statement trees] (default: {False})
+
+    Yields:
+        [list] -- [For each SQL text, the list of its Statements (or lineage records)]
+    """
+    workers = workers or os.cpu_count() or 1
+    parser = parser_class()
+    counter = [0]
+    tasks = _tasks(parser, sql_texts, lineage, counter)
+    if workers == 1:
+        global _worker_parser
+        _worker_parser = parser
+        results = map(_parse_task, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(parser_class, ))
+        results = pool.imap(_parse_task, tasks, chunksize)
+    try:
+        current_index = 0
+        current_results = []
+        for index, statements in results:
+            if pool is not None and not lineage:
+                statements = loads(statements, parser)
+            while current_index < index:
+                yield current_results
+                current_results = []
+                current_index += 1
+            current_results.extend(statements)
+        # SQL texts without any statement do not have a task
+        while current_index < counter[0]:
+            yield current_results
+            current_results = []
+            current_index += 1
+    finally:
+        if pool is not None:
+            pool.terminate()
@@ -0,0 +1,210 @@
+''' Parse cache keyed by the shape of the SQL text, i.e. the text with its
+    literals replaced by placeholders and its whitespace collapsed.
+    Query logs repeat the same statements with different literal values,
+    those are rebuilt from a cached statement tree instead of being parsed.
+'''
+import re
+from collections import OrderedDict, namedtuple
+
+from pygments import token as T
+
+import sqlsense.tokens as ST
+from sqlsense.sql import Token, TokenGroup
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+_SHAPE_RE = re.compile(r'''
+    (?P<comment>--[^\n]*\n?|/\*.*?\*/)
+    |(?P<quoted>"(?:[^"]|"")*")
+    |(?P<dollar>\$(?P<tag>(?:[^\W\d]\w*)?)\$.*?\$(?P=tag)\$)
+    |(?P<string>'(?:[^']|'')*')
+    |(?P<number>(?<![\w$.])(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)
+    |(?P<whitespace>\s+)
+''', re.VERBOSE | re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s*')
+# Number and String literals and their subtypes (see sqlsense.tokens.bit)
+_LITERAL_BITS = ST.bit(T.Number, T.String)
+
+
+def shape(sql_text):
+    """ Returns the shape of the SQL text along with its literals.
+
+    Returns:
+        [tuple] -- [(shape, literals) where literals is the list of (start, end, value)
+        of the string and number literals in the SQL text]
+    """
+    literals = []
+
+    def replace(match):
+        kind = match.lastgroup
+        if kind == 'whitespace':
+            return ' '
+        elif kind == 'string':
+            literals.append((match.start(), match.end(), match.group()))
+            return '\x00s'
+        elif kind == 'number':
+            literals.append((match.start(), match.end(), match.group()))
+            return '\x00i' if match.group().isdigit() else '\x00f'
+        return match.group()
+
+    return _SHAPE_RE.sub(replace, sql_text).strip(), literals
+
+
+def _layout(sql_text, literals):
+    # The SQL text between the literals
+    starts = [start for start, _, _ in literals] + [len(sql_text)]
+    ends = [0] + [end for _, end, _ in literals]
+    return [sql_text[end:start] for start, end in zip(starts, ends)]
+
+
+class _ShapeMismatch(Exception):
+    pass
+
+
+class _Template(object):
+    """ Statements of a cached SQL text, as a flat (preorder) list of nodes per statement.
+        Each node is (parent, ttype, value, start, end, literal number) where parent is
+        the index of the parent node (0 for the statement, nodes are numbered from 1),
+        value is None for token groups and literal number is None for tokens which are
+        not literals. Positions are within the SQL text the statements were parsed from.
+    """
+    __slots__ = ('statements', 'layout', 'literal_lengths')
+
+    def __init__(self, statements, sql_text, literals):
+        self.layout = _layout(sql_text, literals)
+        self.literal_lengths = [end - start for start, end, _ in literals]
+        literal_starts = {start: number for number, (start, _, _) in enumerate(literals)}
+        self.statements = []
+        found = 0
+        for stmt in statements:
+            nodes = []
+            positions = stmt._token_positions()
+            offset = stmt.offset
+            stack = [(0, iter(stmt.token_list))]
+            while stack:
+                (parent, tokens) = stack[-1]
+                token = next(tokens, None)
+                if token is None:
+                    stack.pop()
+                elif isinstance(token, TokenGroup):
+                    nodes.append((parent, token.ttype, None, None, None, None))
+                    stack.append((len(nodes), iter(token.token_list)))
+                else:
+                    (start, end) = positions[token]
+                    (start, end) = (offset + start, offset + end)
+                    literal_number = literal_starts.get(start)
+                    if literal_number is not None and not (
+                            ST.is_subtype(token.ttype, _LITERAL_BITS) and
+                            end == literals[literal_number][1] and token.value() == literals[literal_number][2]):
+                        # The literal is not (exactly) one token
+                        raise _ShapeMismatch()
+                    found += literal_number is not None
+                    nodes.append((parent, token.ttype, token.value(), start, end, literal_number))
+            self.statements.append((stmt.ttype, stmt.offset, nodes))
+        if found != len(literals):
+            raise _ShapeMismatch()
+
+
+class ParseCache(object):
+    """ Cache in front of the parse method of a parser.
+
+        The cache is keyed by the shape of the SQL text (see shape()). On a hit
+        the statements are rebuilt from the cached statements with the literal
+        values of the new SQL text. When the SQL text between the literals is
+        the same as for the cached statements, token positions are shifted
+        by the difference in length of the literals. Otherwise every token is
+        located within the new SQL text and, if anything does not match, the
+        SQL text is parsed instead.
+
+        Datasets and datafields are generated again (on demand) for the rebuilt
+        statements, as they include the literal values (e.g. Sub Query text).
+    """
+
+    def __init__(self, parser, maxsize=1024):
+        self._parser = parser
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def parse(self, sql_text):
+        """ Generator yielding the parsed statements, same as the parse method of the parser.
+        """
+        key, literals = shape(sql_text)
+        entry = self._entries.get(key, False)
+        if entry is not False:
+            self._entries.move_to_end(key)
+            if entry is not None:
+                try:
+                    statements = self._build(entry, sql_text, literals)
+                except _ShapeMismatch:
+                    pass
+                else:
+                    self._hits += 1
+                    for stmt in statements:
+                        yield stmt
+                    return
+        self._misses += 1
+        statements = list(self._parser.parse(sql_text))
+        if entry is False:
+            try:
+                # None marks a shape which can not be rebuilt from the cache
+                self._entries[key] = _Template(statements, sql_text, literals)
+            except _ShapeMismatch:
+                self._entries[key] = None
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        for stmt in statements:
+            yield stmt
+
+    def cache_info(self):
+        return CacheInfo(self._hits, self._misses, self._maxsize, len(self._entries))
+
+    def cache_clear(self):
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def _build(self, template, sql_text, literals):
+        """ Builds the statements of the template with the literals of the SQL text.
+        """
+        same_layout = _layout(sql_text, literals) == template.layout
+        literal_lengths = template.literal_lengths
+        delta = 0
+        position = 0
+        statements = []
+        for (stmt_ttype, stmt_offset, nodes) in template.statements:
+            offset = stmt_offset + delta if same_layout else position
+            stmt = self._parser._new_sql_statement(sql_text, offset)
+            stmt.ttype = stmt_ttype
+            token_groups = [stmt]
+            for (parent, ttype, value, start, end, literal_number) in nodes:
+                token_group = token_groups[parent]
+                if value is None:
+                    token = TokenGroup(ttype=ttype)
+                    token_groups.append(token)
+                else:
+                    if literal_number is not None:
+                        value = literals[literal_number][2]
+                    if same_layout:
+                        start += delta
+                        if literal_number is not None:
+                            delta += len(value) - literal_lengths[literal_number]
+                        end += delta
+                    else:
+                        whitespace_end = _WHITESPACE_RE.match(sql_text, position).end()
+                        if value.isspace():
+                            (start, end) = (position, whitespace_end)
+                        elif sql_text.startswith(value, whitespace_end):
+                            (start, end) = (whitespace_end, whitespace_end + len(value))
+                        else:
+                            raise _ShapeMismatch()
+                    position = end
+                    token = Token(ttype, value)
+                    stmt._add_position(token, start - offset, end - offset)
+                    # Keeps the node numbering of the template
+                    token_groups.append(None)
+                token._parent = token_group
+                token_group._token_list.append(token)
+            statements.append(stmt)
+        return statements
@@ -1,7 +1,52 @@
 import re
 
 from pygments import token as T
-from pygments.filter import simplefilter
+from pygments.filter import Filter, simplefilter
+
+_DIGITS_RE = re.compile(r'\d+', re.ASCII)
+
+
+class TokenRewriteFilter(Filter):
+    """ Rewrites the tokens in a single pass over the token stream.
+
+        Keyword Arguments:
+            rewrites {dict} -- [Rewrite function by token type. The function is called with
+            the (ttype, value) of each token of that (exact) token type and returns the
+            (ttype, value) of the token. A rewritten token is not rewritten again.]
+    """
+
+    def __init__(self, **options):
+        Filter.__init__(self, **options)
+        self._rewrites = dict(options.get('rewrites', {}))
+
+    def filter(self, lexer, stream):
+        rewrites = self._rewrites
+        for ttype, value in stream:
+            rewrite = rewrites.get(ttype)
+            if rewrite is not None:
+                ttype, value = rewrite(ttype, value)
+            yield ttype, value
+
+
+def rewrite_blank_text(ttype, value):
+    """ Rewrite (see TokenRewriteFilter) converting a Blank Text Token to Whitespace Token,
+        same as text_to_whitespace_token.
+    """
+    if value.strip() == '':
+        return T.Whitespace, ' '
+    return ttype, value
+
+
+def rewrite_float(ttype, value):
+    """ Rewrite (see TokenRewriteFilter) converting a Float Token having value '.' to Punctuation
+        Token and a Float Token having only digits to Integer Token, same as float_to_punctuation_token
+        and float_to_integer_token.
+    """
+    if value == '.':
+        return T.Punctuation, value
+    if _DIGITS_RE.fullmatch(value.strip()):
+        return T.Number.Integer, value
+    return ttype, value
 
 
 @simplefilter
@@ -17,7 +62,7 @@ def text_to_whitespace_token(self, lexer, stream, options):
         using simplefilter decorator.
     """
     for ttype, value in stream:
-        if ttype is T.Text and value.strip() == '':
+        if ttype in (T.Text, T.Whitespace) and value.strip() == '':
             ttype = T.Whitespace
             value = ' '
         yield ttype, value
@@ -54,6 +99,6 @@ def float_to_integer_token(self, lexer, stream, options):
         using simplefilter decorator.
     """
     for ttype, value in stream:
-        if ttype is T.Number.Float and re.match("^\d+$", value.strip(), re.ASCII):
+        if ttype is T.Number.Float and _DIGITS_RE.fullmatch(value.strip()):
             ttype = T.Number.Integer
         yield ttype, value
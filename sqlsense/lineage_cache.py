@@ -0,0 +1,283 @@
+''' Persistent lineage cache, e.g. for crawls parsing the same view and function
+    definitions again and again. The lineage records (see sqlsense.batch.lineage_records)
+    of each statement are stored in a SQLite database, keyed by a hash of the statement
+    text: statements found in the cache are not parsed at all.
+
+    The database is opened in WAL mode with memory mapped I/O, so that many processes
+    (each with its own LineageCache) can read it at once while one of them writes.
+    It is stamped with the version of the parser rules (see rules_version), the entries
+    stored by another version of the parser are dropped when the cache is opened.
+'''
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pygments
+
+import sqlsense
+
+from sqlsense.batch import lineage_records
+from sqlsense.cache import CacheInfo
+
+# Version of the stored lineage records, part of rules_version
+LINEAGE_VERSION = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Seconds after which a statement found in the cache is marked as used again,
+# statements found within that time do not make the lookup write to the database
+_USED_RESOLUTION = 3600.0
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS lineage (
+    key BLOB PRIMARY KEY,
+    records TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lineage_used ON lineage (used);
+'''
+
+
+def _source_files(parser):
+    """ Returns the (name, path) of the source files the parsing and lineage depend on:
+        every module of the sqlsense package, and the modules of the parser, Statement
+        and lexer classes (and of their base classes) defined outside of it.
+    """
+    package_dir = os.path.dirname(os.path.abspath(sqlsense.__file__))
+    files = {}
+    for (dir_path, dir_names, file_names) in os.walk(package_dir):
+        dir_names[:] = sorted(name for name in dir_names if name != '__pycache__')
+        for file_name in file_names:
+            if file_name.endswith('.py'):
+                path = os.path.join(dir_path, file_name)
+                files[os.path.relpath(path, package_dir).replace(os.sep, '/')] = path
+    classes = (type(parser).__mro__ + type(parser._get_sql_statement()).__mro__ + type(parser._lexer).__mro__)
+    for cls in classes:
+        module = sys.modules.get(cls.__module__)
+        try:
+            path = inspect.getsourcefile(module) if module is not None else None
+        except TypeError:
+            # Built-in module
+            path = None
+        if path is not None and not os.path.abspath(path).startswith(package_dir + os.sep):
+            files[cls.__module__] = path
+    return sorted(files.items())
+
+
+def rules_version(parser):
+    """ Returns the version stamp of a parser: a hash of its parse rules, of the source
+        of the sqlsense modules and of the modules defining its parser, Statement and
+        lexer classes, along with LINEAGE_VERSION and the version of Pygments.
+        A change to any of these changes the stamp, even if it does not change the
+        lineage (e.g. a comment). It does not depend on the Python version.
+
+        Code outside of those modules is not part of the stamp, e.g. functions of
+        another module called by a parser sub class: bump LINEAGE_VERSION (or clear
+        the cache) when changing it.
+
+    Arguments:
+        parser {SqlParser} -- [Parser instance]
+
+    Returns:
+        [str] -- [Version stamp]
+    """
+    digest = hashlib.sha256('{0}:{1}'.format(LINEAGE_VERSION, pygments.__version__).encode('utf-8'))
+    for rule_key, (action, tokengroup_set) in sorted(parser._parse_rules.items()):
+        digest.update(repr((rule_key, getattr(action, '__qualname__', None), tokengroup_set)).encode('utf-8'))
+    for (name, path) in _source_files(parser):
+        with open(path, 'rb') as source_file:
+            digest.update('{0}:'.format(name).encode('utf-8'))
+            digest.update(hashlib.sha256(source_file.read()).digest())
+    return digest.hexdigest()
+
+
+class LineageCache(object):
+    """ Lineage of SQL texts, the lineage of their statements being looked up in an
+        on-disk cache before parsing them.
+
+        Statements are looked up by their text without the surrounding whitespace
+        (and comments are part of the text). The positions in the stored records are
+        relative to the start of that text, the same statement at another position
+        of another SQL text is found as well.
+
+        The cache holds at most max_bytes of lineage records (not counting the database
+        overhead), the least recently used statements are evicted beyond that.
+    """
+
+    def __init__(self, path, parser, max_bytes=DEFAULT_MAX_BYTES, timeout=30.0):
+        """
+        Arguments:
+            path {str} -- [Path of the SQLite database, created if it does not exist]
+            parser {SqlParser} -- [Parser used for the statements not found in the cache]
+
+        Keyword Arguments:
+            max_bytes {int} -- [Size of the lineage records kept] (default: {DEFAULT_MAX_BYTES})
+            timeout {float} -- [Seconds to wait for another process writing to the database] (default: {30.0})
+        """
+        self._parser = parser
+        self._max_bytes = max_bytes
+        self._hits = 0
+        self._misses = 0
+        self._version = rules_version(parser)
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        # A cache may lose its last entries on a power failure, it is not corrupted
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('PRAGMA mmap_size={0}'.format(max_bytes * 2))
+        with self._transaction():
+            # executescript would commit the transaction first
+            for statement in _SCHEMA.split(';'):
+                if statement.strip():
+                    self._connection.execute(statement)
+            row = self._connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != self._version:
+                self._connection.execute('DELETE FROM lineage')
+                self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self._version, ))
+                self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('size', 0)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    @property
+    def version(self):
+        return self._version
+
+    def lineage(self, sql_text):
+        """ Returns the lineage records of the statements of the SQL text, same as
+            [lineage_records(stmt) for stmt in parser.parse(sql_text)].
+            Only the statements not found in the cache are parsed, and then stored.
+
+        Arguments:
+            sql_text {str} -- [SQL text, may hold one or more statements]
+
+        Returns:
+            [list] -- [{datasets, datafields} of each Statement, where defined_at of each
+            record holds the (start, end) position within the SQL text]
+        """
+        splitter = self._parser._get_statement_splitter()
+        found = []
+        for statement_text in self._statement_texts(splitter, sql_text):
+            text = statement_text.strip()
+            # Position of the stripped text within the SQL text
+            start = splitter.offset + len(statement_text) - len(statement_text.lstrip())
+            found.append((hashlib.sha256(text.encode('utf-8')).digest(), text, start))
+        now = time.time()
+        (cached, used_keys) = self._get([key for key, _, _ in found], now)
+        results = []
+        stored = []
+        for (key, text, start) in found:
+            records = cached.get(key)
+            if records is None:
+                self._misses += 1
+                records = [lineage_records(stmt) for stmt in self._parser.parse(text)]
+                stored.append((key, records))
+                cached[key] = records
+            else:
+                self._hits += 1
+            results.extend(_shifted(statement_records, start) for statement_records in records)
+        if stored or used_keys:
+            self._put(stored, used_keys, now)
+        return results
+
+    def cache_info(self):
+        """ Returns the hits and misses (in statements) of this instance, and the size of the cache.
+        """
+        (size, ) = self._connection.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()
+        return CacheInfo(self._hits, self._misses, self._max_bytes, int(size))
+
+    def cache_clear(self):
+        with self._transaction():
+            self._connection.execute('DELETE FROM lineage')
+            self._connection.execute("UPDATE meta SET value = 0 WHERE name = 'size'")
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _statement_texts(splitter, sql_text):
+        for statement_text in splitter.feed(sql_text):
+            yield statement_text
+        for statement_text in splitter.close():
+            yield statement_text
+
+    def _get(self, keys, now):
+        """ Returns the records of the statements found in the cache by key, along with
+            the keys of the ones to mark as used.
+        """
+        cached = {}
+        used_keys = []
+        for key in set(keys):
+            row = self._connection.execute('SELECT records, used FROM lineage WHERE key = ?', (key, )).fetchone()
+            if row is not None:
+                cached[key] = json.loads(row[0])
+                if now - row[1] > _USED_RESOLUTION:
+                    used_keys.append(key)
+        return cached, used_keys
+
+    def _put(self, stored, used_keys, now):
+        """ Stores the records of the statements parsed, marks the ones found as used and
+            evicts the least recently used statements beyond max_bytes.
+        """
+        with self._transaction():
+            connection = self._connection
+            connection.executemany('UPDATE lineage SET used = ? WHERE key = ?', ((now, key) for key in used_keys))
+            added = 0
+            for (key, records) in stored:
+                records = json.dumps(records, separators=(',', ':'))
+                cursor = connection.execute('INSERT OR IGNORE INTO lineage VALUES (?, ?, ?, ?)',
+                                            (key, records, len(records), now))
+                # Another process may have stored the statement meanwhile
+                added += len(records) if cursor.rowcount else 0
+            if not added:
+                return
+            connection.execute("UPDATE meta SET value = value + ? WHERE name = 'size'", (added, ))
+            (size, ) = connection.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()
+            size = int(size)
+            while size > self._max_bytes:
+                rows = connection.execute('SELECT key, size FROM lineage ORDER BY used LIMIT 64').fetchall()
+                if not rows:
+                    break
+                connection.executemany('DELETE FROM lineage WHERE key = ?', ((key, ) for key, _ in rows))
+                size -= sum(row_size for _, row_size in rows)
+            connection.execute("UPDATE meta SET value = ? WHERE name = 'size'", (max(size, 0), ))
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+
+class _Transaction(object):
+    """ Write transaction of a connection in autocommit mode, taking the database
+        lock at the start so that concurrent writers wait instead of failing.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        self._connection.execute('BEGIN IMMEDIATE')
+        return self._connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._connection.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+
+
+def _shifted(statement_records, start):
+    def shifted(record):
+        record = dict(record)
+        span = record['defined_at']
+        record['defined_at'] = (start + span[0], start + span[1]) if span is not None else None
+        return record
+
+    return {
+        'datasets': [shifted(dataset) for dataset in statement_records['datasets']],
+        'datafields': [shifted(datafield) for datafield in statement_records['datafields']],
+    }
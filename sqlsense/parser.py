@@ -1,21 +1,143 @@
+import bisect
+import codecs
+import os
+import re
+
 from pygments import token as T
 from pygments.lexers.sql import SqlLexer
+from pygments.token import string_to_tokentype
 
 import sqlsense.tokens as ST
-from sqlsense.filter import text_to_whitespace_token
+from sqlsense.batch import parse_many
+from sqlsense.filter import TokenRewriteFilter, rewrite_blank_text
+from sqlsense.profiling import ParseStats, _Profiler
+from sqlsense.splitter import StatementSplitter
 from sqlsense.sql import SqlStatement, Token, TokenGroup
 
+_KEYWORD_RULE_PREFIX = 'Token.Keyword.'
+_NO_RULE = (None, None)
+_WHITESPACE_RE = re.compile(r'\s*')
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Token Groups the handlers climb up to (see SqlParser._switch_to_ancestor)
+_EXPRESSIONS = (ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression)
+_COMPUTED_IDENTIFIER_PARENTS = frozenset((
+    ST.ComputedIdentifier, ST.SelectClause, ST.JoinOnClause, ST.WhereClause, ST.GroupByClause, ST.HavingClause,
+    ST.OrderByClause, ST.RoundBracket, ST.ConditionGroup, ST.CollectionSet, ST.Comparison, ST.Between, ST.Like,
+    ST.Not, ST.NotBetween, ST.NotLike) + _EXPRESSIONS)
+_FROM_CLAUSE_PRECEDING = frozenset((ST.SelectClause, ST.SelectIntoClause, ST.UpdateSetClause))
+_FROM_CLAUSE = frozenset((ST.FromClause, ))
+_GROUP_BY_CLAUSE_PRECEDING = frozenset((ST.FromClause, ST.WhereClause))
+_HAVING_CLAUSE_PRECEDING = frozenset((ST.FromClause, ST.WhereClause, ST.GroupByClause))
+_ORDER_BY_CLAUSE_PRECEDING = frozenset((ST.FromClause, ST.WhereClause, ST.GroupByClause, ST.HavingClause))
+_LOGICAL_OPERATOR_PARENTS = frozenset((
+    ST.JoinOnClause, ST.WhereClause, ST.HavingClause, ST.ConditionGroup, ST.Between, ST.NotBetween) + _EXPRESSIONS)
+_CONDITION_PARENTS = frozenset((
+    ST.JoinOnClause, ST.WhereClause, ST.HavingClause, ST.Condition, ST.RoundBracket, ST.ConditionGroup,
+    ST.Not) + _EXPRESSIONS)
+_EXISTS_PARENTS = frozenset((ST.WhereClause, ST.RoundBracket, ST.ConditionGroup, ST.Not))
+_INTO_PRECEDING = frozenset((ST.InsertIntoClause, ST.SelectClause))
+_NOT_PARENTS = frozenset((
+    ST.JoinOnClause, ST.WhereClause, ST.HavingClause, ST.ConditionGroup, ST.RoundBracket,
+    ST.Comparison) + _EXPRESSIONS)
+_CASE_PARENTS = frozenset((
+    ST.SelectClause, ST.JoinOnClause, ST.WhereClause, ST.HavingClause, ST.ConditionGroup, ST.Condition,
+    ST.RoundBracket, ST.Not) + _EXPRESSIONS)
+_CASE_EXPRESSION = frozenset((ST.CaseExpression, ))
+_WHEN_EXPRESSION = frozenset((ST.WhenExpression, ))
+_SELECT_STATEMENTS = frozenset((ST.Select, ST.SelectInto, ST.InsertIntoSelect, ST.SubQuery))
+# Token Groups checked for on the handler steps
+_SUBQUERY_BRACKETS = frozenset((ST.RoundBracket, ST.CollectionSet))
+_BETWEEN = frozenset((ST.Between, ST.NotBetween))
+_NOT_OPERANDS = frozenset((ST.Identifier, ST.ComputedIdentifier, ST.Function))
+
+
+def _locate(source, position, value):
+    """ Locates the token value within the source text, starting at the given position.
+        The lexer strips the text, normalizes newlines and the Whitespace tokens, so the
+        value may not be an exact substring of the source text.
+
+    Arguments:
+        source {str} -- [SQL text being parsed]
+        position {int} -- [Position where the previous token ended]
+        value {str} -- [Value of the token]
+
+    Returns:
+        [tuple] -- [(start, end) position of the token within the source text]
+    """
+    whitespace_end = _WHITESPACE_RE.match(source, position).end()
+    if value.isspace():
+        return (position, whitespace_end)
+    if source.startswith(value, position):
+        return (position, position + len(value))
+    if source.startswith(value, whitespace_end):
+        return (whitespace_end, whitespace_end + len(value))
+    # The lexer replaces '\r\n' and '\r' by '\n'
+    end = whitespace_end
+    for char in value:
+        if source.startswith(char, end):
+            end += 1
+        elif char == '\n' and source.startswith('\r\n', end):
+            end += 2
+        elif char == '\n' and source.startswith('\r', end):
+            end += 1
+        else:
+            break
+    else:
+        return (whitespace_end, end)
+    start = source.find(value, position)
+    return (start, start + len(value)) if start >= 0 else (position, position)
+
 
 class SqlParser(object):
     """ Base class for all SQL Parsers. Not to be used for actual parsing.
     """
 
     def __init__(self, lexer_object=SqlLexer, end_marker_token=Token(T.Punctuation, ';')):
+        """ Initializes the parser.
+
+        Keyword Arguments:
+            lexer_object {class} -- [Lexer class, a pygments.lexer.Lexer sub class. It is
+            instantiated with the stripall option and the parser adds its filters to it.
+            The parse rules expect the tokens of the Pygments lexer of the SQL dialect,
+            a faster lexer has to generate the same tokens.] (default: {SqlLexer})
+            end_marker_token {Token} -- [Token ending a statement] (default: {Token(T.Punctuation, ';')})
+        """
         self._lexer = lexer_object(stripall=True)
         # self._lexer.add_filter('keywordcase', case='upper')
-        self._lexer.add_filter(text_to_whitespace_token())
+        self._lexer.add_filter(TokenRewriteFilter(rewrites=self._set_token_rewrites_()))
         self._end_marker_token = end_marker_token
         self._parse_rules = self._set_rules_()
+        self._keyword_rules, self._ttype_rules = self._compile_rules_(self._parse_rules)
+        self._profiler = None
+
+    def enable_profiling(self, stats=None):
+        """ Enables the per rule profiling of this parser instance, see sqlsense.profiling.
+            The parse methods are slower while profiling is enabled.
+
+        Keyword Arguments:
+            stats {ParseStats} -- [Statistics to add to, a new ParseStats if None] (default: {None})
+
+        Returns:
+            [ParseStats] -- [Statistics updated by the parse methods until profiling is disabled]
+        """
+        if self._profiler is not None:
+            self.disable_profiling()
+        self._profiler = _Profiler(self, stats if stats is not None else ParseStats())
+        self._profiler.install()
+        return self._profiler.stats
+
+    def disable_profiling(self):
+        """ Disables the profiling, restoring the parse rules and methods of this parser instance.
+
+        Returns:
+            [ParseStats] -- [Statistics collected, None if profiling was not enabled]
+        """
+        if self._profiler is None:
+            return None
+        self._profiler.uninstall()
+        (stats, self._profiler) = (self._profiler.stats, None)
+        return stats
 
     def _get_sql_statement(self):
         """ Returns the SQL Statement class instance
@@ -26,32 +148,57 @@ class SqlParser(object):
         """
         return SqlStatement()
 
-    def parse(self, sql_text):
-        def token_stream(sql_text):
-            for ttype, value in self._lexer.get_tokens(sql_text):
-                yield Token(ttype, value)
+    def _get_statement_splitter(self):
+        """ Returns the Statement Splitter used to split SQL text read in chunks.
+            Child Class may override this function to support dialect specific quoting.
+        Returns:
+            [class object instance] -- StatementSplitter class instance
+        """
+        return StatementSplitter(end_marker=self._end_marker_token.value())
 
+    def _new_sql_statement(self, sql_text, offset):
         stmt = self._get_sql_statement()
+        stmt._source = sql_text
+        stmt._offset = offset
+        return stmt
+
+    def _token_stream(self, sql_text, start=0):
+        """ Generator yielding the Tokens of the SQL text (from the start position
+            onwards) along with their position within the SQL text: (token, start, end).
+        """
+        position = start
+        for ttype, value in self._lexer.get_tokens(sql_text[start:] if start else sql_text):
+            (token_start, position) = _locate(sql_text, position, value)
+            yield (Token(ttype, value), token_start, position)
+
+    def parse(self, sql_text):
+        return self._parse_tokens(sql_text, 0, self._token_stream(sql_text))
+
+    def _parse_tokens(self, sql_text, offset, tokens):
+        """ Generator yielding the Statements built from the Tokens of the SQL text,
+            the first Statement starting at the offset.
+        """
+        keyword_rules = self._keyword_rules
+        ttype_rules = self._ttype_rules
+        (end_marker_ttype, end_marker_value) = (self._end_marker_token.ttype, self._end_marker_token.value())
+        stmt = self._new_sql_statement(sql_text, offset)
         curr_tk_grp = stmt
-        for tk in token_stream(sql_text):
+        for (tk, start, end) in tokens:
             # print('{0}: <{1}>'.format(tk.ttype, tk.value()))
-            if tk.match_type_value(self._end_marker_token):
+            # Token positions are relative to the Statement offset
+            stmt._add_position(tk, start - stmt._offset, end - stmt._offset)
+            if tk.is_(end_marker_ttype, end_marker_value):
                 # Statement complete
                 stmt.append(tk)
                 yield stmt
-                stmt = self._get_sql_statement()
+                stmt = self._new_sql_statement(sql_text, end)
                 curr_tk_grp = stmt
                 continue
-            rule_key = str(tk.ttype)
-            if tk.ttype == T.Keyword:
-                rule_key = 'Token.Keyword.{0}'.format(tk.value().upper())
-            elif tk.ttype in T.Number:
-                rule_key = 'Token.Literal.Number'
-            elif tk.ttype in T.String:
-                rule_key = 'Token.Literal.String'
+            if tk.ttype is T.Keyword:
+                rule = keyword_rules.get(tk.value().upper(), _NO_RULE)
             else:
-                rule_key = str(tk.ttype)
-            (action, tokengrp_set) = self._parse_rules[rule_key] if rule_key in self._parse_rules else (None, None)
+                rule = ttype_rules.get(tk.ttype) or self._resolve_ttype_rule(tk.ttype)
+            (action, tokengrp_set) = rule
             if action:
                 curr_tk_grp = action(stmt, curr_tk_grp, tk, tokengrp_set)
             else:
@@ -63,23 +210,194 @@ class SqlParser(object):
             yield stmt
         return 0
 
+    def reparse(self, statements, offset, deleted_length, inserted_text):
+        """ Parses the SQL text again after an edit, e.g. in an editor. Only the
+            Statements from the one the edit starts in up to the first one ending where
+            a Statement after the edit started are lexed and parsed again. The Statements
+            before and after them are reused, along with their datasets and datafields.
+
+            The reused Statements are updated in place: their source becomes the edited
+            SQL text and the offsets of the ones after the edit are shifted.
+
+        Arguments:
+            statements {list} -- [Statements returned by parse for the SQL text before the edit]
+            offset {int} -- [Position of the edit within the SQL text before the edit]
+            deleted_length {int} -- [Number of characters deleted at the position]
+            inserted_text {str} -- [Text inserted at the position]
+
+        Returns:
+            [list] -- [Statements of the edited SQL text, same as parse would yield]
+        """
+        if not statements:
+            raise ValueError('No statements to reparse, parse the SQL text instead')
+        source = statements[0]._source
+        if source is None or any(stmt._source is not source for stmt in statements):
+            raise ValueError('Statements are not the result of parsing a single SQL text')
+        edit_end = offset + deleted_length
+        if offset < 0 or deleted_length < 0 or edit_end > len(source):
+            raise ValueError('Edit ({0}, {1}) is not within the SQL text'.format(offset, deleted_length))
+        sql_text = source[:offset] + inserted_text + source[edit_end:]
+        delta = len(inserted_text) - deleted_length
+
+        # Last Statement starting at or before the edit. A Statement starts after the end
+        # marker of the previous one: the lexer and parser states are the same there
+        # as when parsing from the beginning, so lexing starts again at that end marker.
+        end_marker = self._end_marker_token
+        offsets = [stmt._offset for stmt in statements]
+        first = bisect.bisect_right(offsets, offset) - 1
+        start = offsets[first] - len(end_marker.value()) if first > 0 else 0
+        if not (self._can_lex_from(source, start) and self._can_lex_from(sql_text, start)):
+            return list(self.parse(sql_text))
+        tokens = self._token_stream(sql_text, start)
+        if first > 0:
+            (tk, tk_start, _) = next(tokens, (None, None, None))
+            if tk is None or tk_start != start or not tk.is_(end_marker.ttype, end_marker.value()):
+                return list(self.parse(sql_text))
+        # Statements after the edit, by the offset they start at in the edited SQL text. The
+        # first Statement can not follow another one, the lexer strips its leading Whitespace.
+        reusable = {stmt._offset + delta: index for index, stmt in enumerate(statements)
+                    if index >= max(first, 1) and stmt._offset >= edit_end}
+
+        new_statements = []
+        index = len(statements)
+        parsed = self._parse_tokens(sql_text, offsets[first] if first > 0 else 0, tokens)
+        for stmt in parsed:
+            new_statements.append(stmt)
+            last_token = stmt.token_list[-1]
+            if last_token.is_(end_marker.ttype, end_marker.value()):
+                # The end marker is the last token the Statement has a position for
+                index = reusable.get(stmt._offset + stmt._ends[-1], index)
+                if index < len(statements):
+                    parsed.close()
+                    break
+        for stmt in statements[:first]:
+            stmt._source = sql_text
+        for stmt in statements[index:]:
+            stmt._source = sql_text
+            stmt._offset += delta
+        return statements[:first] + new_statements + statements[index:]
+
+    def parse_file(self, path_or_fileobj, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8'):
+        """ Parses a SQL file, reading it in chunks. Only the statement being
+            parsed (and one chunk) is held in memory, so the file can be of any size.
+
+        Arguments:
+            path_or_fileobj {str|PathLike|file object} -- [Path of the SQL file or an open file
+            object (text or binary)]
+
+        Keyword Arguments:
+            chunk_size {int} -- [Number of characters (or bytes) read at a time] (default: {DEFAULT_CHUNK_SIZE})
+            encoding {str} -- [Encoding of the file, used for paths and binary file objects] (default: {'utf-8'})
+
+        Yields:
+            [SqlStatement] -- [Parsed Statements. The source of each Statement is its own text,
+            its positions are relative to that text.]
+        """
+        if isinstance(path_or_fileobj, (str, bytes, os.PathLike)):
+            with open(path_or_fileobj, 'r', encoding=encoding) as fileobj:
+                for stmt in self.parse_file(fileobj, chunk_size=chunk_size):
+                    yield stmt
+            return
+        splitter = self._get_statement_splitter()
+        decoder = None
+        while True:
+            data = path_or_fileobj.read(chunk_size)
+            chunk = data
+            if isinstance(data, bytes):
+                # A chunk may end within a multibyte character and decode to ''
+                decoder = decoder or codecs.getincrementaldecoder(encoding)()
+                chunk = decoder.decode(data, final=not data)
+            for statement_text in splitter.feed(chunk):
+                for stmt in self.parse(statement_text):
+                    yield stmt
+            if not data:
+                break
+        for statement_text in splitter.close():
+            for stmt in self.parse(statement_text):
+                yield stmt
+
+    def parse_many(self, sql_texts, workers=None, chunksize=16, lineage=False):
+        """ Parses many independent SQL texts in parallel worker processes,
+            each with its own instance of this parser class.
+            See sqlsense.batch.parse_many for the arguments.
+
+        Yields:
+            [list] -- [For each SQL text (in input order), the list of its Statements,
+            or of their lineage records if lineage is True]
+        """
+        return parse_many(type(self), sql_texts, workers=workers, chunksize=chunksize, lineage=lineage)
+
+    def _can_lex_from(self, sql_text, position):
+        """ Returns True if the Tokens before the position do not depend on the text after it
+            and the end markers after it are where the lexer is back to its initial state, so
+            that reparse can lex the SQL text again from an end marker at the position.
+            Child Class may override this function if its lexer looks ahead or behind.
+        """
+        return True
+
+    def _compile_rules_(self, parse_rules):
+        """ Compiles the string keyed rules returned by _set_rules_ into dispatch tables.
+
+        Arguments:
+            parse_rules {dict} -- [Rules as returned by _set_rules_]
+
+        Returns:
+            [tuple] -- [(keyword_rules, ttype_rules) where keyword_rules is keyed by the
+            uppercased Keyword value and ttype_rules is keyed by the token type]
+        """
+        keyword_rules = {rule_key[len(_KEYWORD_RULE_PREFIX):]: rule
+                         for rule_key, rule in parse_rules.items() if rule_key.startswith(_KEYWORD_RULE_PREFIX)}
+        ttype_rules = {}
+        for rule_key, rule in parse_rules.items():
+            if not rule_key.startswith(_KEYWORD_RULE_PREFIX):
+                ttype = string_to_tokentype(rule_key)
+                if ttype not in T.Number and ttype not in T.String:
+                    ttype_rules[ttype] = rule
+        return keyword_rules, ttype_rules
+
+    def _resolve_ttype_rule(self, ttype):
+        """ Resolves the rule for a token type not yet in the dispatch table
+            and stores it, so that it is resolved only once.
+        """
+        if ttype in T.Number:
+            rule_key = 'Token.Literal.Number'
+        elif ttype in T.String:
+            rule_key = 'Token.Literal.String'
+        else:
+            rule_key = str(ttype)
+        rule = self._parse_rules.get(rule_key, _NO_RULE)
+        self._ttype_rules[ttype] = rule
+        return rule
+
     def _switch_to_parent(self, token_group):
+        whitespace_token = token_group.token_list[-1]
         if token_group.pop_whitespace_token():
             # If Token Group has Whitespace at its end, move ito its Parent Group
-            token_group.parent.append(Token(T.Whitespace, ' '))
+            token_group.parent.append(whitespace_token)
         return token_group.parent
 
+    def _switch_to_ancestor(self, token_group, ttypes):
+        """ Gets out of the Token Groups until the nearest one (the Token Group itself
+            included) of one of the token types, moving trailing Whitespace up at each level.
+            The open Token Groups are the ancestors of the current one, each of them
+            is climbed out of at most once.
+
+        Arguments:
+            token_group {TokenGroup} -- [Current Token Group]
+            ttypes {frozenset} -- [Token types looked for]
+
+        Returns:
+            [TokenGroup] -- [Nearest Token Group of one of the token types]
+        """
+        while token_group.ttype not in ttypes:
+            token_group = self._switch_to_parent(token_group)
+        return token_group
+
     def _setup_computed_identifier(self, stmt, token_group, token):
         if token.value() in ('+', '-', '*', '/', '%', '^'):
             if token_group.ttype == ST.SelectConstantIdentifier:
                 token_group.ttype = ST.ComputedIdentifier
-            while token_group.ttype not in (ST.ComputedIdentifier, ST.SelectClause, ST.JoinOnClause,
-                                            ST.WhereClause, ST.GroupByClause, ST.HavingClause, ST.OrderByClause,
-                                            ST.RoundBracket, ST.ConditionGroup, ST.CollectionSet,
-                                            ST.Comparison, ST.Between, ST.Like,
-                                            ST.Not, ST.NotBetween, ST.NotLike,
-                                            ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-                token_group = self._switch_to_parent(token_group)
+            token_group = self._switch_to_ancestor(token_group, _COMPUTED_IDENTIFIER_PARENTS)
             if token_group.ttype != ST.ComputedIdentifier:
                 token_group = token_group.merge_into_token_group(
                     ST.ComputedIdentifier, token_list_start_index_included=token_group.last_token_index())
@@ -88,13 +406,13 @@ class SqlParser(object):
 
     def _process_select_clause(self, stmt, token_group, token, tokengroup_set):
         select_clause_grp = TokenGroup([token, ], ST.SelectClause)
-        if token_group.ttype in (ST.RoundBracket, ST.CollectionSet):
+        if token_group.ttype in _SUBQUERY_BRACKETS:
             # TODO: Should we check the preceeding token to make sure SELECT is the first keyword in Brackets
             token_group.ttype = ST.SubQuery
-        elif (token_group.ttype in (ST.Select, ST.SelectInto, ST.InsertIntoSelect, ST.SubQuery)
-              and (token_group.last_token().match_type_value(Token(T.Keyword, 'UNION'))
-                   or (token_group.last_token().match_type_value(Token(T.Keyword, 'ALL'))
-                       and token_group.token_before(next_token_index=token_group.last_token_index()).match_type_value(Token(T.Keyword, 'UNION'))
+        elif (token_group.ttype in _SELECT_STATEMENTS
+              and (token_group.last_token().is_(T.Keyword, 'UNION')
+                   or (token_group.last_token().is_(T.Keyword, 'ALL')
+                       and token_group.token_before(next_token_index=token_group.last_token_index()).is_(T.Keyword, 'UNION')
                        )
                    )
               ):  # token_group.has_token_as_immediate_child(Token(T.Keyword, 'UNION')):
@@ -119,11 +437,10 @@ class SqlParser(object):
     def _process_from_clause(self, stmt, token_group, token, tokengroup_set):
         from_clause_grp = TokenGroup([token, ], ST.FromClause)
 
-        while token_group.ttype not in (ST.SelectClause, ST.SelectIntoClause, ST.UpdateSetClause):
-            # TODO: Think about Delete From Clause before getting out
-            # Get out of the Token Group until you find preceeding
-            # (Select Clause, Select Into Clause, Update Set Clause)
-            token_group = self._switch_to_parent(token_group)
+        # TODO: Think about Delete From Clause before getting out
+        # Get out of the Token Group until you find preceeding
+        # (Select Clause, Select Into Clause, Update Set Clause)
+        token_group = self._switch_to_ancestor(token_group, _FROM_CLAUSE_PRECEDING)
 
         # Get out of the Clause Token Group and exit
         token_group = self._switch_to_parent(token_group)
@@ -134,9 +451,8 @@ class SqlParser(object):
     def _process_where_clause(self, stmt, token_group, token, tokengroup_set):
         where_clause_grp = TokenGroup([token, ], ST.WhereClause)
 
-        while token_group.ttype not in (ST.FromClause, ):
-            # Get out of the Token Group until you find preceeding From Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find preceeding From Clause
+        token_group = self._switch_to_ancestor(token_group, _FROM_CLAUSE)
 
         # Get out of the Clause Token Group and exit
         token_group = self._switch_to_parent(token_group)
@@ -146,9 +462,8 @@ class SqlParser(object):
     def _process_group_by_clause(self, stmt, token_group, token, tokengroup_set):
         group_by_clause_grp = TokenGroup([token, ], ST.GroupByClause)
 
-        while token_group.ttype not in (ST.FromClause, ST.WhereClause):
-            # Get out of the Token Group until you find preceeding From / Where Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find preceeding From / Where Clause
+        token_group = self._switch_to_ancestor(token_group, _GROUP_BY_CLAUSE_PRECEDING)
 
         # Get out of the Clause Token Group and exit
         token_group = self._switch_to_parent(token_group)
@@ -158,10 +473,9 @@ class SqlParser(object):
     def _process_having_clause(self, stmt, token_group, token, tokengroup_set):
         having_clause_grp = TokenGroup([token, ], ST.HavingClause)
 
-        while token_group.ttype not in (ST.FromClause, ST.WhereClause, ST.GroupByClause):
-            # NOTE: Having Clause need not require Group By Clause before it
-            # Get out of the Token Group until you find preceeding From / Where / Group By Clause
-            token_group = self._switch_to_parent(token_group)
+        # NOTE: Having Clause need not require Group By Clause before it
+        # Get out of the Token Group until you find preceeding From / Where / Group By Clause
+        token_group = self._switch_to_ancestor(token_group, _HAVING_CLAUSE_PRECEDING)
 
         # Get out of the Clause Token Group and exit
         token_group = self._switch_to_parent(token_group)
@@ -171,9 +485,8 @@ class SqlParser(object):
     def _process_order_by_clause(self, stmt, token_group, token, tokengroup_set):
         order_by_clause_grp = TokenGroup([token, ], ST.OrderByClause)
 
-        while token_group.ttype not in (ST.FromClause, ST.WhereClause, ST.GroupByClause, ST.HavingClause):
-            # Get out of the Token Group until you find preceeding Where / Group By / Having Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find preceeding Where / Group By / Having Clause
+        token_group = self._switch_to_ancestor(token_group, _ORDER_BY_CLAUSE_PRECEDING)
 
         # Get out of the Clause Token Group and exit
         token_group = self._switch_to_parent(token_group)
@@ -181,28 +494,23 @@ class SqlParser(object):
         return order_by_clause_grp
 
     def _process_join(self, stmt, token_group, token, tokengroup_set):
-        while token_group.ttype != ST.FromClause:
-            # Get out of the Token Group until you find the matching From Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find the matching From Clause
+        token_group = self._switch_to_ancestor(token_group, _FROM_CLAUSE)
         token_group.append(token)
         return token_group
 
     def _process_on(self, stmt, token_group, token, tokengroup_set):
         join_on_grp = TokenGroup([token, ], ST.JoinOnClause)
-        while token_group.ttype != ST.FromClause:
-            # Get out of the Token Group until you find the matching From Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find the matching From Clause
+        token_group = self._switch_to_ancestor(token_group, _FROM_CLAUSE)
         token_group.append(join_on_grp)
         return join_on_grp
 
     def _process_and(self, stmt, token_group, token, tokengroup_set):
         token.ttype = ST.LogicalOperator
-        while token_group.ttype not in (ST.JoinOnClause, ST.WhereClause, ST.HavingClause,
-                                        ST.ConditionGroup, ST.Between, ST.NotBetween,
-                                        ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-            # Get out of the Token Group until you find preceeding Join On, Where, Having Clause
-            token_group = self._switch_to_parent(token_group)
-        if token_group.ttype in (ST.Between, ST.NotBetween) and token_group.has_token_as_immediate_child(token):
+        # Get out of the Token Group until you find preceeding Join On, Where, Having Clause
+        token_group = self._switch_to_ancestor(token_group, _LOGICAL_OPERATOR_PARENTS)
+        if token_group.ttype in _BETWEEN and token_group.has_token_as_immediate_child(token):
             # Between Clause should not have more than one AND Operator
             # Get out of the Token Group until you find preceeding Where, Having Clause
             token_group = self._switch_to_parent(token_group)
@@ -212,26 +520,19 @@ class SqlParser(object):
 
     def _process_or(self, stmt, token_group, token, tokengroup_set):
         token.ttype = ST.LogicalOperator
-        while token_group.ttype not in (ST.JoinOnClause, ST.WhereClause, ST.HavingClause,
-                                        ST.ConditionGroup, ST.Between, ST.NotBetween,
-                                        ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-            # Get out of the Token Group until you find preceeding Join On, Where, Having Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find preceeding Join On, Where, Having Clause
+        token_group = self._switch_to_ancestor(token_group, _LOGICAL_OPERATOR_PARENTS)
         token_group.append(token)
         return token_group
 
     def _process_in(self, stmt, token_group, token, tokengroup_set):
-        while token_group.ttype not in (ST.JoinOnClause, ST.WhereClause, ST.HavingClause,
-                                        ST.Condition, ST.RoundBracket, ST.ConditionGroup, ST.Not,
-                                        ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-            # Get out of the Token Group until you find Condition Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Condition Clause
+        token_group = self._switch_to_ancestor(token_group, _CONDITION_PARENTS)
         if token_group.ttype == ST.RoundBracket:
             token_group.ttype = ST.ConditionGroup
         if token_group.ttype == ST.Condition:
             # This will mostly be NOT IN Condition
-            token_group.ttype = ST.NotIn if token_group.last_token().match_type_value(
-                Token(ST.LogicalOperator, 'NOT')) else ST.In
+            token_group.ttype = ST.NotIn if token_group.last_token().is_(ST.LogicalOperator, 'NOT') else ST.In
         else:
             token_group = token_group.merge_into_token_group(
                 ST.In, token_list_start_index_included=token_group.last_token_index())
@@ -257,14 +558,11 @@ class SqlParser(object):
         return token_group
 
     def _process_exists(self, stmt, token_group, token, tokengroup_set):
-        while token_group.ttype not in (ST.WhereClause,  # ST.JoinOnClause, ST.HavingClause,
-                                        ST.RoundBracket, ST.ConditionGroup, ST.Not, ):  # ST.Condition,
-                                        # ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-            # Get out of the Token Group until you find Condition Clause
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Condition Clause
+        token_group = self._switch_to_ancestor(token_group, _EXISTS_PARENTS)
         if token_group.ttype == ST.RoundBracket:
             token_group.ttype = ST.ConditionGroup
-        if token_group.ttype == ST.Not and token_group.last_token().match_type_value(Token(ST.LogicalOperator, 'NOT')):
+        if token_group.ttype == ST.Not and token_group.last_token().is_(ST.LogicalOperator, 'NOT'):
             token_group.ttype = ST.NotExists
             token_group.append(token)
             return token_group
@@ -274,10 +572,9 @@ class SqlParser(object):
 
     def _process_into(self, stmt, token_group, token, tokengroup_set):
         # Assumption: INTO Clause will never be in a Sub-Query
-        while token_group.ttype not in (ST.InsertIntoClause, ST.SelectClause):
-            # Get out of the Token Group until you find preceeding
-            # (Insert Into Clause, Select Clause)
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find preceeding
+        # (Insert Into Clause, Select Clause)
+        token_group = self._switch_to_ancestor(token_group, _INTO_PRECEDING)
         if token_group.ttype == ST.InsertIntoClause:
             # INSERT INTO statement, just append INTO Keyword
             token_group.append(token)
@@ -295,14 +592,11 @@ class SqlParser(object):
         # TODO: NOT can be in SELECT Clause as well
         # TODO: IS Condition
         token.ttype = ST.LogicalOperator
-        while token_group.ttype not in (ST.JoinOnClause, ST.WhereClause, ST.HavingClause,
-                                        ST.ConditionGroup, ST.RoundBracket, ST.Comparison,
-                                        ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-            # Get out of the Token Group until you find Where, JoinOn, Having Clause or ConditionGroup
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Where, JoinOn, Having Clause or ConditionGroup
+        token_group = self._switch_to_ancestor(token_group, _NOT_PARENTS)
         if token_group.ttype == ST.RoundBracket:
             token_group.ttype = ST.ConditionGroup
-        if token_group.last_token().ttype not in (ST.Identifier, ST.ComputedIdentifier, ST.Function):
+        if token_group.last_token().ttype not in _NOT_OPERANDS:
             not_condition_grp = TokenGroup([token, ], ST.Not)
             token_group.append(not_condition_grp)
             return not_condition_grp
@@ -326,51 +620,43 @@ class SqlParser(object):
 
     def _process_case(self, stmt, token_group, token, tokengroup_set):
         case_exp_grp = TokenGroup([token, ], ST.CaseExpression)
-        while token_group.ttype not in (ST.SelectClause, ST.JoinOnClause, ST.WhereClause, ST.HavingClause,
-                                        ST.ConditionGroup, ST.Condition, ST.RoundBracket, ST.Not,
-                                        ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-            # TODO: Might need to consider ComputedIdentifier Case
-            # Get out of the Token Group until you find appropriate Clause
-            token_group = self._switch_to_parent(token_group)
+        # TODO: Might need to consider ComputedIdentifier Case
+        # Get out of the Token Group until you find appropriate Clause
+        token_group = self._switch_to_ancestor(token_group, _CASE_PARENTS)
         token_group.append(case_exp_grp)
         return case_exp_grp
 
     def _process_when(self, stmt, token_group, token, tokengroup_set):
         when_exp_grp = TokenGroup([token, ], ST.WhenExpression)
-        while token_group.ttype not in (ST.CaseExpression):
-            # Get out of the Token Group until you find Case Expression
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Case Expression
+        token_group = self._switch_to_ancestor(token_group, _CASE_EXPRESSION)
         token_group.append(when_exp_grp)
         return when_exp_grp
 
     def _process_then(self, stmt, token_group, token, tokengroup_set):
         then_exp_grp = TokenGroup([token, ], ST.ThenExpression)
-        while token_group.ttype not in (ST.WhenExpression):
-            # Get out of the Token Group until you find When Expression
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find When Expression
+        token_group = self._switch_to_ancestor(token_group, _WHEN_EXPRESSION)
         token_group.append(then_exp_grp)
         return then_exp_grp
 
     def _process_else(self, stmt, token_group, token, tokengroup_set):
         else_exp_grp = TokenGroup([token, ], ST.ElseExpression)
-        while token_group.ttype not in (ST.CaseExpression):
-            # Get out of the Token Group until you find Case Expression
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Case Expression
+        token_group = self._switch_to_ancestor(token_group, _CASE_EXPRESSION)
         token_group.append(else_exp_grp)
         return else_exp_grp
 
     def _process_end(self, stmt, token_group, token, tokengroup_set):
-        while token_group.ttype not in (ST.CaseExpression):
-            # Get out of the Token Group until you find Case Expression
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Case Expression
+        token_group = self._switch_to_ancestor(token_group, _CASE_EXPRESSION)
         token_group.append(token)
         token_group = self._switch_to_parent(token_group)
         return token_group
 
     def _process_union(self, stmt, token_group, token, tokengroup_set):
-        while token_group.ttype not in (ST.Select, ST.SelectInto, ST.InsertIntoSelect, ST.SubQuery):
-            # Get out of the Token Group until you find Case Expression
-            token_group = self._switch_to_parent(token_group)
+        # Get out of the Token Group until you find Case Expression
+        token_group = self._switch_to_ancestor(token_group, _SELECT_STATEMENTS)
         token_group.append(token)
         return token_group
 
@@ -392,8 +678,7 @@ class SqlParser(object):
             token_group.append(select_constant_identifier_grp)
             token_group = select_constant_identifier_grp
         elif token_group.token_list[-1].ttype == T.String:
-            setattr(token_group.token_list[-1], '_value',
-                    token_group.token_list[-1].value() + token.value())
+            token_group.token_list[-1].extend(token)
         else:
             token_group.append(token)
         return token_group
@@ -407,6 +692,15 @@ class SqlParser(object):
     def _process_operator(self, stmt, token_group, token, tokengroup_set):
         raise NotImplementedError
 
+    def _set_token_rewrites_(self):
+        ''' Returns the rewrite function by token type applied to the tokens generated
+            by the lexer (see TokenRewriteFilter). You may extend this function in Child classes
+        '''
+        return {
+            T.Text: rewrite_blank_text,
+            T.Whitespace: rewrite_blank_text,
+        }
+
     def _set_rules_(self):
         ''' You may extend this function in Child classes
         '''
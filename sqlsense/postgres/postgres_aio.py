@@ -0,0 +1,7 @@
+from sqlsense.aio import AsyncParser
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+class AsyncPostgresParser(AsyncParser):
+    def __init__(self, parser_class=PostgresParser, **kwargs):
+        super().__init__(parser_class, **kwargs)
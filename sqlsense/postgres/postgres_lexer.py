@@ -0,0 +1,202 @@
+''' Lexer for the PostgreSQL dialect of SQL, generating the same tokens as
+    pygments.lexers.sql.PostgresLexer without its regex state machine.
+'''
+import re
+
+from pygments.lexer import Lexer
+from pygments.lexers._postgres_builtins import DATATYPES, KEYWORDS, PSEUDO_TYPES
+from pygments.lexers.sql import PostgresBase, language_callback
+from pygments.token import Comment, Error, Keyword, Name, Number, Operator, Punctuation, String, Whitespace
+
+# Alternatives are listed in the order of the PostgresLexer rules, for the ones
+# which can match at the same character. Words (data types, keywords, string
+# prefixes and names) are told apart in get_tokens_unprocessed.
+# The regex is case sensitive (faster), [a-z] of the case insensitive PostgresLexer
+# rules also matches a few non ASCII characters (e.g. the Kelvin sign).
+_TOKEN_RE = re.compile(r'''
+    (?P<word>[a-zA-Z_\u0130\u0131\u017f\u212a]\w*)
+    |(?P<whitespace>\s+)
+    |(?P<comment>--.*\n?)
+    |(?P<multiline_comment>/\*)
+    |(?P<operator>[+*/<>=~!@\#%^&|`?-]+|::)
+    |(?P<variable>\$\d+)
+    |(?P<number>(?:[0-9]*\.[0-9]*|[0-9]+)(?:[eE][+-]?[0-9]+)?)
+    |(?P<string>')
+    |(?P<quoted_identifier>")
+    |(?P<dollar>\$)
+    |(?P<psql_variable>:(?P<psql_quote>['"]?)[a-zA-Z\u0130\u0131\u017f\u212a]\w*\b(?P=psql_quote))
+    |(?P<punctuation>[;:()\[\]{},.])
+''', re.VERBOSE)
+_STRING_RE = re.compile(r"[^']+|''|'")
+_QUOTED_IDENTIFIER_RE = re.compile(r'[^"]+|""|"')
+_MULTILINE_COMMENT_RE = re.compile(r'/\*|\*/|[^/*]+|[/*]')
+# Same as the PostgresLexer rule, language_callback relies on its groups
+_DOLLAR_STRING_RE = re.compile(r'(?s)(\$)([^$]*)(\$)(.*?)(\$)(\2)(\$)', re.IGNORECASE)
+
+
+def _words():
+    """ Returns the data types and keywords by their lower case (first) word, as
+        (data types, keyword indicator). Each data type is either the word itself or,
+        for data types of more than one word, a regex matching it. The data types
+        of a word are in the order PostgresLexer tries them, before the keywords.
+    """
+    words = {}
+    for data_type in DATATYPES + PSEUDO_TYPES:
+        data_type_words = data_type.split(' ')
+        if len(data_type_words) > 1:
+            data_type = re.compile(r'\s+'.join(data_type_words) + r'\b', re.IGNORECASE)
+        words.setdefault(data_type_words[0].lower(), ([], False))[0].append(data_type)
+    for keyword in KEYWORDS:
+        words[keyword.lower()] = (words.get(keyword.lower(), ((), False))[0], True)
+    return words
+
+
+_WORDS = _words()
+_NO_WORD = ((), False)
+# Non ASCII characters equal to ASCII letters for case insensitive regexes
+_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+# Token types of the _TOKEN_RE alternatives matching a complete token
+_TTYPES = {
+    'whitespace': Whitespace,
+    'punctuation': Punctuation,
+    'number': Number.Float,
+    'operator': Operator,
+    'comment': Comment.Single,
+    'variable': Name.Variable,
+    'psql_variable': Name.Variable,
+}
+
+
+class PostgresFastLexer(PostgresBase, Lexer):
+    """ Lexer for the PostgreSQL dialect of SQL.
+
+        Generates the same tokens as the Pygments PostgresLexer, matching
+        a token with a single regex instead of trying each rule in turn.
+        Filters and options (e.g. stripall) are handled by the Pygments
+        Lexer class, so the lexer is a drop in replacement.
+    """
+
+    name = 'PostgreSQL SQL dialect (fast)'
+    aliases = []
+
+    def get_tokens_unprocessed(self, text):
+        # language_callback looks for the LANGUAGE of dollar quoted strings in the text
+        self.text = text
+        length = len(text)
+        pos = 0
+        while pos < length:
+            # Restarted whenever the end of a token is not found by _TOKEN_RE (e.g. string literals)
+            for match in _TOKEN_RE.finditer(text, pos):
+                start = match.start()
+                while pos < start:
+                    # No token starts at pos
+                    yield pos, Error, text[pos]
+                    pos += 1
+                kind = match.lastgroup
+                value = match.group()
+                ttype = _TTYPES.get(kind)
+                if ttype is not None:
+                    yield pos, ttype, value
+                    pos = match.end()
+                elif kind == 'word':
+                    word = value.lower() if value.isascii() else value.translate(_FOLD).lower()
+                    (data_types, keyword) = _WORDS.get(word, _NO_WORD)
+                    data_type_value = self._match_data_type(text, pos, value, data_types) if data_types else None
+                    if data_type_value is not None:
+                        yield pos, Name.Builtin, data_type_value
+                        pos += len(data_type_value)
+                        if len(data_type_value) > len(value):
+                            break
+                    elif keyword:
+                        yield pos, Keyword, value
+                        pos = match.end()
+                    elif value in ('E', 'e') and text.startswith("'", pos + 1):
+                        yield pos, String.Affix, value
+                        yield pos + 1, String.Single, "'"
+                        pos = yield from self._quoted(text, pos + 2, _STRING_RE, String.Single, "'")
+                        break
+                    elif value in ('U', 'u') and text.startswith("&'", pos + 1):
+                        yield pos, String.Affix, text[pos:pos + 2]
+                        yield pos + 2, String.Single, "'"
+                        pos = yield from self._quoted(text, pos + 3, _STRING_RE, String.Single, "'")
+                        break
+                    elif value in ('U', 'u') and text.startswith('&"', pos + 1):
+                        yield pos, String.Affix, text[pos:pos + 2]
+                        yield pos + 2, String.Name, '"'
+                        pos = yield from self._quoted(text, pos + 3, _QUOTED_IDENTIFIER_RE, String.Name, '"')
+                        break
+                    else:
+                        yield pos, Name, value
+                        pos = match.end()
+                elif kind == 'string':
+                    yield pos, String.Single, value
+                    pos = yield from self._quoted(text, pos + 1, _STRING_RE, String.Single, "'")
+                    break
+                elif kind == 'quoted_identifier':
+                    yield pos, String.Name, value
+                    pos = yield from self._quoted(text, pos + 1, _QUOTED_IDENTIFIER_RE, String.Name, '"')
+                    break
+                elif kind == 'multiline_comment':
+                    yield pos, Comment.Multiline, value
+                    pos = yield from self._multiline_comment(text, pos + 2)
+                    break
+                else:
+                    # Dollar quoted string
+                    dollar_match = _DOLLAR_STRING_RE.match(text, pos)
+                    if dollar_match is None:
+                        yield pos, Error, value
+                        pos += 1
+                    else:
+                        yield from language_callback(self, dollar_match)
+                        pos = dollar_match.end()
+                        break
+            else:
+                while pos < length:
+                    yield pos, Error, text[pos]
+                    pos += 1
+
+    @staticmethod
+    def _match_data_type(text, pos, word, data_types):
+        """ Returns the data type at the position, None if none of the data types
+            starting with the word matches.
+        """
+        for data_type in data_types:
+            if isinstance(data_type, str):
+                return word
+            data_type_match = data_type.match(text, pos)
+            if data_type_match is not None:
+                return data_type_match.group()
+        return None
+
+    @staticmethod
+    def _quoted(text, pos, part_re, ttype, quote):
+        """ Generator yielding the parts of a string literal or quoted identifier,
+            up to the closing quote. Returns the position after the closing quote.
+        """
+        length = len(text)
+        while pos < length:
+            value = part_re.match(text, pos).group()
+            yield pos, ttype, value
+            pos += len(value)
+            if value == quote:
+                break
+        return pos
+
+    @staticmethod
+    def _multiline_comment(text, pos):
+        """ Generator yielding the parts of a (possibly nested) multiline comment.
+            Returns the position after the end of the comment.
+        """
+        depth = 1
+        length = len(text)
+        while pos < length:
+            value = _MULTILINE_COMMENT_RE.match(text, pos).group()
+            yield pos, Comment.Multiline, value
+            pos += len(value)
+            if value == '/*':
+                depth += 1
+            elif value == '*/':
+                depth -= 1
+                if depth == 0:
+                    break
+        return pos
@@ -1,32 +1,58 @@
+import re
+
 from pygments import token as T
-from pygments.lexers.sql import PostgresLexer
 
 import sqlsense.postgres.postgres_tokens as PT
 import sqlsense.tokens as ST
-from sqlsense.filter import float_to_integer_token, float_to_punctuation_token
-from sqlsense.parser import SqlParser
+from sqlsense.filter import rewrite_float
+from sqlsense.parser import _SELECT_STATEMENTS, _SUBQUERY_BRACKETS, SqlParser
+from sqlsense.postgres.postgres_lexer import PostgresFastLexer
 from sqlsense.postgres.postgres_sql import PostgresSqlStatement
-from sqlsense.sql import Token, TokenGroup
+from sqlsense.splitter import StatementSplitter
+from sqlsense.sql import TokenGroup
+
+# Words near which the lexer lexes dollar quoted strings with another lexer
+_SUBLEXER_RE = re.compile(r'\b(?:LANGUAGE|DO)\b', re.IGNORECASE)
+
+# Token Groups the handlers climb up to (see SqlParser._switch_to_ancestor)
+_BRACKETS = frozenset((ST.RoundBracket, ST.ArgumentList, ST.SubQuery, ST.CollectionSet, ST.ConditionGroup))
+_COMPARISON_PARENTS = frozenset((
+    ST.RoundBracket, ST.ConditionGroup, ST.JoinOnClause, ST.WhereClause, ST.HavingClause, ST.Not,
+    ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression))
+# Token Groups and types checked for on the handler steps
+_ALIAS_PARENTS = frozenset((ST.SelectClause, ST.FromClause))
+_KEYWORD_OR_PUNCTUATION = frozenset((T.Keyword, T.Punctuation))
+_IN = frozenset((ST.In, ST.NotIn))
+_LIST_ITEMS = frozenset((
+    ST.Identifier, ST.ComputedIdentifier, ST.SelectConstantIdentifier, ST.Function, ST.CaseExpression, ST.SubQuery))
+# RoundBracket and its subtypes (see sqlsense.tokens.bit)
+_ROUND_BRACKET_BIT = ST.bit(ST.RoundBracket)
 
 
 class PostgresParser(SqlParser):
-    def __init__(self):
-        super().__init__(lexer_object=PostgresLexer)
-        self._lexer.add_filter(float_to_integer_token())
-        self._lexer.add_filter(float_to_punctuation_token())
+    def __init__(self, lexer_object=PostgresFastLexer):
+        super().__init__(lexer_object=lexer_object)
 
     def _get_sql_statement(self):
         return PostgresSqlStatement()
 
+    def _can_lex_from(self, sql_text, position):
+        # A dollar quoted string is matched up to its closing delimiter, wherever it is, and
+        # lexed as the LANGUAGE found near it (plpgsql after DO), making end markers within it
+        return '$' not in sql_text or (sql_text.find('$', 0, position) < 0 and _SUBLEXER_RE.search(sql_text) is None)
+
+    def _get_statement_splitter(self):
+        return StatementSplitter(end_marker=self._end_marker_token.value(), dollar_quotes=True, copy_data=True)
+
     def _process_name(self, stmt, token_group, token, tokengroup_set):
-        if token_group.last_token().match_type_value(Token(T.Keyword, 'AS')):
+        if token_group.last_token().is_(T.Keyword, 'AS'):
             # Alias follows AS Keyword
             token.ttype = ST.AliasName
             token_group.append(token)
-        elif (token_group.parent.ttype in (ST.SelectClause, ST.FromClause) and
+        elif (token_group.parent.ttype in _ALIAS_PARENTS and
               ((token_group.ttype == ST.Identifier and token_group.last_token().ttype == T.Name) or
                (token_group.ttype == ST.Function and token_group.last_token().ttype == ST.ArgumentList) or
-               (token_group.ttype == ST.SubQuery and token_group.last_token().match_type_value(Token(T.Punctuation, ')'))) or
+               (token_group.ttype == ST.SubQuery and token_group.last_token().is_(T.Punctuation, ')')) or
                (token_group.ttype == ST.ComputedIdentifier and token_group.last_token().ttype != T.Operator) or
                token_group.ttype == ST.SelectConstantIdentifier)):
             # Alias withot AS Keyword. Here TokenGroup has to be direct child of Select/From clause
@@ -38,7 +64,7 @@ class PostgresParser(SqlParser):
             # Case: SELECT A.x+B.y SomeAlias FROM ...
             # here Computed Identifier => A.x+B.y and Identifier => B.y followed by Alias
             return self._process_name(stmt, self._switch_to_parent(token_group), token, tokengroup_set)
-        elif (token_group.ttype == ST.SelectClause and token_group.last_token().ttype not in (T.Keyword, T.Punctuation)):
+        elif (token_group.ttype == ST.SelectClause and token_group.last_token().ttype not in _KEYWORD_OR_PUNCTUATION):
             # Case: SELECT CASE ... END AS case_alias
             token_group = token_group.merge_into_token_group(
                 ST.ComputedIdentifier, token_list_start_index_included=token_group.last_token_index())
@@ -73,7 +99,7 @@ class PostgresParser(SqlParser):
                 token_group = token_group.merge_into_token_group(
                     PT.WithQueryAliasIdentifier, token_list_start_index_included=token_group.last_token_index())
                 bracket_grp.ttype = ST.ArgumentList
-            elif token_group.ttype in (ST.In, ST.NotIn):
+            elif token_group.ttype in _IN:
                 # This can be the CollectionSet or SubQuery (ttype will set to SubQuery in subsequent steps).
                 bracket_grp.ttype = ST.CollectionSet
             token_group.append(bracket_grp)
@@ -83,9 +109,8 @@ class PostgresParser(SqlParser):
                 # This step is required because when a Sub-Query is closed with ')' we do not switch
                 # to its parent. This is done so that we can add alias to it if it exists
                 return self._process_punctuation(stmt, self._switch_to_parent(token_group), token, tokengroup_set)
-            while token_group.ttype not in (ST.RoundBracket, ST.ArgumentList, ST.SubQuery, ST.CollectionSet, ST.ConditionGroup):
-                # Get out of the Token Group until you find the matching opening bracket
-                token_group = self._switch_to_parent(token_group)
+            # Get out of the Token Group until you find the matching opening bracket
+            token_group = self._switch_to_ancestor(token_group, _BRACKETS)
             token_group.append(token)
             if token_group.ttype == ST.RoundBracket and token_group.parent.ttype == ST.SelectClause:
                 token_group = token_group.parent.merge_into_token_group(
@@ -98,7 +123,7 @@ class PostgresParser(SqlParser):
             token.ttype = ST.QualifierOperator
             token_group.append(token)
         elif token.value() == ',':
-            if token_group.ttype in (ST.Identifier, ST.ComputedIdentifier, ST.SelectConstantIdentifier, ST.Function, ST.CaseExpression, ST.SubQuery):
+            if token_group.ttype in _LIST_ITEMS:
                 # Get out of the Token Group, so that we can create another Identifier
                 token_group = self._switch_to_parent(token_group)
             if token_group.ttype == PT.WithIdentifier:
@@ -110,7 +135,7 @@ class PostgresParser(SqlParser):
         if token.value() == '*':
             # * can be a Wildcard in Select Clause
             if (token_group.ttype == ST.SelectClause or
-                    (token_group.ttype in (ST.Identifier, ) and token_group.last_token().ttype == ST.QualifierOperator)):
+                    (token_group.ttype == ST.Identifier and token_group.last_token().ttype == ST.QualifierOperator)):
                 # SELECT * FROM ...
                 # SELECT table.* FROM ... or SELECT alias.* FROM ...
                 # TODO: Is it true for Identifier.Function?
@@ -121,11 +146,9 @@ class PostgresParser(SqlParser):
                     stmt, token_group, token)
         elif token.value() in ('=', '!=', '<>', '<', '<=', '>', '>='):
             token.ttype = ST.ComparisonOperator
-            while token_group.ttype not in (ST.RoundBracket, ST.ConditionGroup, ST.JoinOnClause, ST.WhereClause, ST.HavingClause, ST.Not,
-                                            ST.CaseExpression, ST.WhenExpression, ST.ThenExpression, ST.ElseExpression):
-                # Get out of the Token Group until you find the matching Condition Clause
-                token_group = self._switch_to_parent(token_group)
-            if token_group.ttype in (ST.RoundBracket):
+            # Get out of the Token Group until you find the matching Condition Clause
+            token_group = self._switch_to_ancestor(token_group, _COMPARISON_PARENTS)
+            if ST.is_subtype(token_group.ttype, _ROUND_BRACKET_BIT):
                 token_group.ttype = ST.ConditionGroup
             token_group = token_group.merge_into_token_group(
                 ST.Comparison, token_list_start_index_included=token_group.last_token_index())
@@ -138,14 +161,13 @@ class PostgresParser(SqlParser):
     def _process_limit(self, stmt, token_group, token, tokengroup_set):
         # Assumption: LIMIT will be at SELECT Statement Level
         limit_clause_grp = TokenGroup([token, ], PT.LimitClause)
-        while token_group.ttype not in (ST.Select, ST.SelectInto, ST.InsertIntoSelect, ST.SubQuery):
-            token_group = self._switch_to_parent(token_group)
+        token_group = self._switch_to_ancestor(token_group, _SELECT_STATEMENTS)
         token_group.append(limit_clause_grp)
         return limit_clause_grp
 
     def _process_with_clause(self, stmt, token_group, token, tokengroup_set):
         with_clause_grp = TokenGroup([token, ], PT.WithClause)
-        if token_group.ttype in (ST.RoundBracket, ST.CollectionSet):
+        if token_group.ttype in _SUBQUERY_BRACKETS:
             token_group.ttype = ST.SubQuery
         else:
             while token_group.ttype is not None:
@@ -158,6 +180,13 @@ class PostgresParser(SqlParser):
         token.ttype = T.Name
         return self._process_name(stmt, token_group, token, tokengroup_set)
 
+    def _set_token_rewrites_(self):
+        ''' You may extend this function in Child classes
+        '''
+        rewrites = super()._set_token_rewrites_()
+        rewrites[T.Number.Float] = rewrite_float
+        return rewrites
+
     def _set_rules_(self):
         ''' You may extend this function in Child classes
         '''
@@ -2,16 +2,115 @@
     Parts of the code are similar to / copied from sqlparse: https://github.com/andialbrecht/sqlparse
 '''
 
+from operator import attrgetter
+
 from pygments import token as T
 
 import sqlsense.postgres.postgres_tokens as PT
 import sqlsense.tokens as ST
-from sqlsense.sql import SqlStatement, Token
+from sqlsense.sql import Lineage, LineageRecord, SqlStatement
+
+# Token types checked for on each identifier of a Statement
+_DATASET_PARENTS = frozenset((ST.FromClause, PT.WithClause))
+_DATAFIELD_NAMES = frozenset((T.Name, ST.AllColumnsIdentifier))
+_COMPUTED_DATAFIELDS = frozenset((ST.ComputedIdentifier, ST.SelectConstantIdentifier, ST.Function))
+
+
+def _text_before_alias(token_group):
+    """ Returns the text (without comments) of the tokens of the group before its alias.
+    """
+    values = []
+    for sub_token in token_group.token_list:
+        if sub_token.ttype == ST.AliasName or sub_token.is_(T.Keyword, 'AS'):
+            break
+        values.append(sub_token.value(True))
+    return ''.join(values)
+
+
+def _with_query_text(token_group):
+    text = ''
+    for subtoken in token_group.token_list:
+        if subtoken.ttype == ST.SubQuery:
+            text = subtoken.value()
+    return text
+
+
+class Dataset(LineageRecord):
+    ''' Dataset (table, view, Sub Query or With Query) involved in a Postgres SQL Statement.
+        The dataset of a Sub Query or With Query is the text of its query, computed on first access.
+    '''
+    __slots__ = ('type', '_dataset', 'schema', 'catalog', 'alias', 'rw_ind', 'defined_at')
+    _fields = ('type', 'dataset', 'schema', 'catalog', 'alias', 'rw_ind', 'defined_at')
+    _field_values = attrgetter(*_fields)
+
+    def __init__(self, type, dataset, schema, catalog, alias, rw_ind, defined_at):
+        self.type = type
+        # None until the text of the query is computed
+        self._dataset = dataset
+        self.schema = schema
+        self.catalog = catalog
+        self.alias = alias
+        self.rw_ind = rw_ind
+        self.defined_at = defined_at
+        self._extra = None
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            self._dataset = (_with_query_text(self.defined_at) if self.type == 'With Query'
+                             else _text_before_alias(self.defined_at))
+        return self._dataset
+
+    @dataset.setter
+    def dataset(self, value):
+        self._dataset = value
+
+
+class Datafield(LineageRecord):
+    ''' Datafield (column or expression) involved in a Postgres SQL Statement.
+        The datafield of a Computed, Function or Constant Field is the text of
+        its expression, computed on first access.
+    '''
+    __slots__ = ('type', '_datafield', 'datafield_alias', 'dataset', 'schema', 'catalog',
+                 'dataset_type', 'dataset_alias', 'rw_ind', 'defined_at')
+    _fields = ('type', 'datafield', 'datafield_alias', 'dataset', 'schema', 'catalog',
+               'dataset_type', 'dataset_alias', 'rw_ind', 'defined_at')
+    _field_values = attrgetter(*_fields)
+
+    def __init__(self, type, datafield, datafield_alias, dataset, schema, catalog,
+                 dataset_type, dataset_alias, rw_ind, defined_at):
+        self.type = type
+        # None until the text of the expression is computed
+        self._datafield = datafield
+        self.datafield_alias = datafield_alias
+        self.dataset = dataset
+        self.schema = schema
+        self.catalog = catalog
+        self.dataset_type = dataset_type
+        self.dataset_alias = dataset_alias
+        self.rw_ind = rw_ind
+        self.defined_at = defined_at
+        self._extra = None
+
+    @property
+    def datafield(self):
+        if self._datafield is None:
+            self._datafield = _text_before_alias(self.defined_at)
+        return self._datafield
+
+    @datafield.setter
+    def datafield(self, value):
+        self._datafield = value
 
 
 class PostgresSqlStatement(SqlStatement):
     ''' SQL Statement class
     '''
+    __slots__ = ('_default_catalog', '_default_schema', '_datasets', '_datafields', '_links',
+                 '_datasets_by_alias', '_datasets_by_name')
+
+    # With Query identifiers are generated by get_identifiers as well
+    _identifier_ttypes = SqlStatement._identifier_ttypes.union((PT.WithIdentifier, ))
 
     def __init__(self, token_list=None, ttype=None, default_catalog=None, default_schema=None):
         super().__init__(token_list=token_list, ttype=ttype)
@@ -19,6 +118,10 @@ class PostgresSqlStatement(SqlStatement):
         self._default_schema = default_schema
         self._datasets = None
         self._datafields = None
+        self._links = None
+        # First dataset for each alias / dataset name, built along with _datasets
+        self._datasets_by_alias = None
+        self._datasets_by_name = None
 
     @property
     def default_catalog(self):
@@ -28,9 +131,6 @@ class PostgresSqlStatement(SqlStatement):
     def default_schema(self):
         return self._default_schema
 
-    def get_identifiers(self):
-        return super().get_identifiers(tokengroup_set={PT.WithIdentifier, })
-
     def datasets_involved(self):
         """ Returns a list of datasets involved in the Postgres 
         SQL Statement.
@@ -43,59 +143,7 @@ class PostgresSqlStatement(SqlStatement):
             SQL Statement.
             {type, dataset, schema, catalog, alias, rr_ind, defined_at}
         """
-        if self._datasets is None:
-            # Datasets info needs to be generated.
-            self._datasets = []
-            for token in self.get_identifiers():
-                if token.parent.ttype in (ST.FromClause, PT.WithClause):
-                    _dataset = {
-                        'type': 'NotKnown',
-                        'dataset': '',
-                        'schema': self._default_schema,
-                        'catalog': self._default_catalog,
-                        'alias': None,
-                        'rw_ind': 'r',
-                        'defined_at': token,
-                    }
-                    if token.ttype == ST.SubQuery:
-                        _dataset['type'] = 'Sub Query'
-                        subquery_ind = True
-                        for subquery_token in token.token_list:
-                            if subquery_token.ttype == ST.AliasName:
-                                _dataset['alias'] = subquery_token.value()
-                                subquery_ind = False
-                            elif subquery_token.match_type_value(Token(T.Keyword, 'AS')):
-                                subquery_ind = False
-                            if subquery_ind:
-                                _dataset['dataset'] = _dataset['dataset'] + \
-                                    subquery_token.value(True)
-                    elif token.ttype == PT.WithIdentifier:
-                        _dataset['type'] = 'With Query'
-                        for subtoken in token.token_list:
-                            if subtoken.ttype == PT.WithQueryAliasName:
-                                _dataset['alias'] = subtoken.value()
-                            elif subtoken.ttype == PT.WithQueryAliasIdentifier:
-                                for subsubtoken in subtoken.token_list:
-                                    if subsubtoken.ttype == PT.WithQueryAliasName:
-                                        _dataset['alias'] = subtoken.value()
-                            elif subtoken.ttype == ST.SubQuery:
-                                _dataset['dataset'] = subtoken.value()
-                    else:
-                        _dataset['type'] = 'Dataset'
-                        qualifier = []
-                        for sub_token in token.token_list:
-                            if sub_token.ttype == T.Name:
-                                _dataset['dataset'] = sub_token.value()
-                            elif sub_token.ttype == ST.AliasName:
-                                _dataset['alias'] = sub_token.value()
-                            elif sub_token.ttype == ST.QualifierName:
-                                qualifier.append(sub_token.value())
-                        if len(qualifier) >= 1:
-                            _dataset['schema'] = qualifier[-1]
-                        if len(qualifier) == 2:
-                            _dataset['catalog'] = qualifier[-2]
-                    self._datasets.append(_dataset)
-        return self._datasets
+        return self.extract_lineage().datasets
 
     def datafields_involved(self):
         """ Returns a list of datafields involved in the Postgres 
@@ -109,69 +157,132 @@ class PostgresSqlStatement(SqlStatement):
             SQL Statement.
             {type, datafield, dataset, schema, catalog, dataset_alias, datafield_alias, rr_ind, defined_at}
         """
-        if self._datafields is None:
-            # Datafields info needs to be generated.
-            self.datasets_involved()
+        return self.extract_lineage().datafields
+
+    def extract_lineage(self):
+        """ Returns the datasets and datafields involved in the Postgres
+        SQL Statement along with the links between them, collected
+        with a single walk through the identifiers of the Statement.
+        The information is generated when the function (or datasets_involved
+        or datafields_involved) is called for the first time and stored.
+
+        Returns:
+            [Lineage] -- (datasets, datafields, links) where datasets and datafields
+            are the lists returned by datasets_involved and datafields_involved and
+            links is the list of (datafield, dataset) for the datafields whose
+            qualifier refers to a dataset of the Statement.
+        """
+        if self._links is None:
+            # Lineage info needs to be generated.
+            self._datasets = []
             self._datafields = []
             for token in self.get_identifiers():
-                if token.parent.ttype not in (ST.FromClause, ):
-                    _datafield = {
-                        'type': 'NotKnown',
-                        'datafield': '',
-                        'datafield_alias': None,
-                        'dataset': None,
-                        'schema': None,
-                        'catalog': None,
-                        'dataset_type': None,
-                        'dataset_alias': None,
-                        'rw_ind': 'r',
-                        'defined_at': token,
-                    }
-                    if token.ttype == ST.Identifier:
-                        _datafield['type'] = 'Datafield'
-                        for sub_token in token.token_list:
-                            if sub_token.ttype in (T.Name, ST.AllColumnsIdentifier):
-                                _datafield['datafield'] = sub_token.value()
-                            elif sub_token.ttype == ST.AliasName:
-                                _datafield['datafield_alias'] = sub_token.value()
-                            elif sub_token.ttype == ST.QualifierName:
-                                _datafield['dataset_alias'] = sub_token.value()
-                        # Get Dataset info
-                        if _datafield['dataset_alias']:
-                            dataset_alias_found = False
-                            for dset in self._datasets:
-                                # Using Alias
-                                if _datafield['dataset_alias'] == dset['alias']:
-                                    _datafield['dataset'] = dset['dataset']
-                                    _datafield['dataset_type'] = dset['type']
-                                    _datafield['schema'] = dset['schema']
-                                    _datafield['catalog'] = dset['catalog']
-                                    dataset_alias_found = True
-                                    break
-                            if not dataset_alias_found:
-                                for dset in self._datasets:
-                                    # Using Dataset Name
-                                    if _datafield['dataset_alias'] == dset['dataset']:
-                                        _datafield['dataset'] = dset['dataset']
-                                        _datafield['dataset_type'] = dset['type']
-                                        _datafield['schema'] = dset['schema']
-                                        _datafield['catalog'] = dset['catalog']
-                                        break
-                    elif token.ttype in (ST.ComputedIdentifier, ST.SelectConstantIdentifier, ST.Function):
-                        _datafield['type'] = 'Computed Field' if token.ttype == ST.ComputedIdentifier else (
-                            'Function Field' if token.ttype == ST.Function else 'Constant Field')
-                        not_an_alias_ind = True
-                        for sub_token in token.token_list:
-                            if sub_token.ttype == ST.AliasName:
-                                _datafield['datafield_alias'] = sub_token.value()
-                                not_an_alias_ind = False
-                            elif sub_token.match_type_value(Token(T.Keyword, 'AS')):
-                                not_an_alias_ind = False
-                            if not_an_alias_ind:
-                                _datafield['datafield'] = _datafield['datafield'] + \
-                                    sub_token.value(True)
-                    else:
-                        # No need to process
-                        continue
-                    self._datafields.append(_datafield)
-        return self._datafields
+                parent_ttype = token.parent.ttype
+                if parent_ttype in _DATASET_PARENTS:
+                    self._datasets.append(self._dataset_info(token))
+                if parent_ttype != ST.FromClause:
+                    _datafield = self._datafield_info(token)
+                    if _datafield is not None:
+                        self._datafields.append(_datafield)
+            self._index_datasets()
+            # Datasets are defined after the datafields (SELECT ... FROM),
+            # qualifiers are resolved once all the datasets are known.
+            self._links = []
+            for _datafield in self._datafields:
+                if _datafield.dataset_alias:
+                    dset = self._find_dataset(_datafield.dataset_alias)
+                    if dset is not None:
+                        _datafield.dataset = dset.dataset
+                        _datafield.dataset_type = dset.type
+                        _datafield.schema = dset.schema
+                        _datafield.catalog = dset.catalog
+                        self._links.append((_datafield, dset))
+        return Lineage(self._datasets, self._datafields, self._links)
+
+    def _dataset_info(self, token):
+        (dataset, schema, catalog, alias) = ('', self._default_schema, self._default_catalog, None)
+        if token.ttype == ST.SubQuery:
+            dataset_type = 'Sub Query'
+            # Text of the Sub Query, computed on first access
+            dataset = None
+            for subquery_token in token.token_list:
+                if subquery_token.ttype == ST.AliasName:
+                    alias = subquery_token.value()
+        elif token.ttype == PT.WithIdentifier:
+            dataset_type = 'With Query'
+            # Text of the query, computed on first access
+            dataset = None
+            for subtoken in token.token_list:
+                if subtoken.ttype == PT.WithQueryAliasName:
+                    alias = subtoken.value()
+                elif subtoken.ttype == PT.WithQueryAliasIdentifier:
+                    for subsubtoken in subtoken.token_list:
+                        if subsubtoken.ttype == PT.WithQueryAliasName:
+                            alias = subtoken.value()
+        else:
+            dataset_type = 'Dataset'
+            qualifier = []
+            for sub_token in token.token_list:
+                if sub_token.ttype == T.Name:
+                    dataset = sub_token.value()
+                elif sub_token.ttype == ST.AliasName:
+                    alias = sub_token.value()
+                elif sub_token.ttype == ST.QualifierName:
+                    qualifier.append(sub_token.value())
+            if len(qualifier) >= 1:
+                schema = qualifier[-1]
+            if len(qualifier) == 2:
+                catalog = qualifier[-2]
+        return Dataset(dataset_type, dataset, schema, catalog, alias, 'r', token)
+
+    def _datafield_info(self, token):
+        """ Returns the datafield defined by the identifier, None if the identifier is not a datafield.
+            The dataset of the datafield is filled in by extract_lineage.
+        """
+        (datafield, datafield_alias, dataset_alias) = ('', None, None)
+        if token.ttype == ST.Identifier:
+            datafield_type = 'Datafield'
+            for sub_token in token.token_list:
+                if sub_token.ttype in _DATAFIELD_NAMES:
+                    datafield = sub_token.value()
+                elif sub_token.ttype == ST.AliasName:
+                    datafield_alias = sub_token.value()
+                elif sub_token.ttype == ST.QualifierName:
+                    dataset_alias = sub_token.value()
+        elif token.ttype in _COMPUTED_DATAFIELDS:
+            datafield_type = 'Computed Field' if token.ttype == ST.ComputedIdentifier else (
+                'Function Field' if token.ttype == ST.Function else 'Constant Field')
+            # Text of the expression, computed on first access
+            datafield = None
+            for sub_token in token.token_list:
+                if sub_token.ttype == ST.AliasName:
+                    datafield_alias = sub_token.value()
+        else:
+            # No need to process
+            return None
+        return Datafield(datafield_type, datafield, datafield_alias, None, None, None, None, dataset_alias, 'r', token)
+
+    def _index_datasets(self):
+        self._datasets_by_alias = {}
+        self._datasets_by_name = {}
+        for dset in self._datasets:
+            # setdefault keeps the first dataset found for a name. The name of a Sub Query
+            # (or With Query) is its text in brackets, never a qualifier.
+            self._datasets_by_alias.setdefault(dset.alias, dset)
+            if dset.type == 'Dataset':
+                self._datasets_by_name.setdefault(dset.dataset, dset)
+
+    def _find_dataset(self, name):
+        """ Returns the dataset a qualifier refers to, looking up the dataset
+            aliases first and then the dataset names.
+
+        Arguments:
+            name {str} -- [Qualifier of a datafield]
+
+        Returns:
+            [Dataset] -- [Dataset, None if not found]
+        """
+        dset = self._datasets_by_alias.get(name)
+        if dset is None:
+            dset = self._datasets_by_name.get(name)
+        return dset
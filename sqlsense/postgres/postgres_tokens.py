@@ -1,6 +1,6 @@
 from pygments.token import Token
 
-from sqlsense.tokens import Identifier, TokenGroup
+from sqlsense.tokens import Identifier, TokenGroup, register
 
 LimitClause = TokenGroup.LimitClause
 
@@ -8,3 +8,5 @@ WithClause = TokenGroup.WithClause
 WithIdentifier = TokenGroup.WithIdentifier
 WithQueryAliasIdentifier = Identifier.WithQueryAliasIdentifier
 WithQueryAliasName = Token.Name.WithQueryAliasName
+
+register(Token)
@@ -0,0 +1,210 @@
+''' Per rule profiling of the parse loop, enabled on a parser instance with
+    SqlParser.enable_profiling. Nothing is instrumented until it is enabled:
+    the parse rules, _switch_to_parent, _token_stream and _parse_tokens of the
+    instance are replaced by timing wrappers, and restored when disabled.
+'''
+import csv
+import sys
+from time import perf_counter
+
+CSV_FIELDS = ('rule', 'calls', 'seconds', 'climbs', 'max_climbs')
+
+
+class RuleStats(object):
+    """ Statistics of a parse rule: number of calls, cumulative time spent in the
+        rule action and number of _switch_to_parent calls (climbs) made by the action.
+    """
+    __slots__ = ('calls', 'seconds', 'climbs', 'max_climbs')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.climbs = 0
+        # Most climbs made by a single call
+        self.max_climbs = 0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'climbs': self.climbs,
+            'max_climbs': self.max_climbs,
+        }
+
+
+class ParseStats(object):
+    """ Statistics collected while profiling is enabled on a parser.
+
+        rules holds the RuleStats of each rule key of the parse rules (as returned
+        by _set_rules_). Tokens without a rule are appended to the
+        current Token Group by the parse loop and are only counted in tokens.
+        Time spent outside of parse (e.g. by the caller between two statements)
+        is not included.
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.statements = 0
+        self.tokens = 0
+        # Time spent in parse, of which lexer_seconds generating the Tokens
+        self.parse_seconds = 0.0
+        self.lexer_seconds = 0.0
+        # Climbs closing the Token Groups left open at the end of the SQL text
+        self.closing_climbs = 0
+
+    @property
+    def tree_seconds(self):
+        """ Time spent in parse building the statement trees, i.e. not generating Tokens.
+        """
+        return self.parse_seconds - self.lexer_seconds
+
+    def rule(self, rule_key):
+        rule_stats = self.rules.get(rule_key)
+        if rule_stats is None:
+            rule_stats = self.rules[rule_key] = RuleStats()
+        return rule_stats
+
+    def reset(self):
+        # The RuleStats are kept, the instrumented rules of a parser add to them
+        rules = self.rules
+        self.__init__()
+        for rule_key, rule_stats in rules.items():
+            rule_stats.__init__()
+            self.rules[rule_key] = rule_stats
+
+    def as_dict(self):
+        """ Returns the statistics as a dict of plain values, e.g. to be exported with json.dump.
+        """
+        return {
+            'statements': self.statements,
+            'tokens': self.tokens,
+            'parse_seconds': self.parse_seconds,
+            'lexer_seconds': self.lexer_seconds,
+            'tree_seconds': self.tree_seconds,
+            'closing_climbs': self.closing_climbs,
+            'rules': {rule_key: rule_stats.as_dict() for rule_key, rule_stats in self.rules.items()},
+        }
+
+    def write_csv(self, fileobj):
+        """ Writes the statistics of the rules as CSV, one row per rule key (see CSV_FIELDS).
+        """
+        writer = csv.writer(fileobj)
+        writer.writerow(CSV_FIELDS)
+        for rule_key, rule_stats in self._sorted_rules():
+            writer.writerow((rule_key, rule_stats.calls, rule_stats.seconds,
+                             rule_stats.climbs, rule_stats.max_climbs))
+
+    def dump(self, fileobj=None, limit=None):
+        """ Prints the statistics, the rules in descending order of time spent.
+
+        Keyword Arguments:
+            fileobj {file object} -- [Where to print] (default: {sys.stdout})
+            limit {int} -- [Number of rules printed, all of them if None] (default: {None})
+        """
+        fileobj = fileobj or sys.stdout
+        print('{0} statements, {1} tokens in {2:.6f}s: lexer {3:.6f}s, tree {4:.6f}s, {5} closing climbs'.format(
+            self.statements, self.tokens, self.parse_seconds, self.lexer_seconds, self.tree_seconds,
+            self.closing_climbs), file=fileobj)
+        print('{0:<40} {1:>9} {2:>11} {3:>9} {4:>11}'.format(*CSV_FIELDS), file=fileobj)
+        for rule_key, rule_stats in self._sorted_rules()[:limit]:
+            print('{0:<40} {1:>9} {2:>11.6f} {3:>9} {4:>11}'.format(
+                rule_key, rule_stats.calls, rule_stats.seconds, rule_stats.climbs, rule_stats.max_climbs),
+                file=fileobj)
+
+    def _sorted_rules(self):
+        return sorted(self.rules.items(), key=lambda item: item[1].seconds, reverse=True)
+
+
+class _Profiler(object):
+    """ Instruments a parser instance, collecting the statistics into a ParseStats.
+    """
+
+    def __init__(self, parser, stats):
+        self.stats = stats
+        self._parser = parser
+        self._parse_rules = parser._parse_rules
+        # RuleStats of the rule action being called and the climbs it has made so far
+        self._current = None
+        self._climbs = 0
+
+    def install(self):
+        parser = self._parser
+        parser._parse_rules = {rule_key: (self._timed(rule_key, action), tokengrp_set)
+                               for rule_key, (action, tokengrp_set) in self._parse_rules.items()}
+        parser._keyword_rules, parser._ttype_rules = parser._compile_rules_(parser._parse_rules)
+        # Instance attributes take precedence over the methods of the class
+        parser._switch_to_parent = self._switch_to_parent_wrapper(parser._switch_to_parent)
+        parser._token_stream = self._token_stream_wrapper(parser._token_stream)
+        parser._parse_tokens = self._parse_wrapper(parser._parse_tokens)
+
+    def uninstall(self):
+        parser = self._parser
+        for name in ('_switch_to_parent', '_token_stream', '_parse_tokens'):
+            delattr(parser, name)
+        parser._parse_rules = self._parse_rules
+        parser._keyword_rules, parser._ttype_rules = parser._compile_rules_(parser._parse_rules)
+
+    def _timed(self, rule_key, action):
+        rule_stats = self.stats.rule(rule_key)
+
+        def timed_action(stmt, token_group, token, tokengroup_set):
+            (caller, caller_climbs) = (self._current, self._climbs)
+            self._current = rule_stats
+            self._climbs = 0
+            start = perf_counter()
+            try:
+                if action:
+                    return action(stmt, token_group, token, tokengroup_set)
+                # Same as the parse loop does for a rule without action
+                token_group.append(token)
+                return token_group
+            finally:
+                rule_stats.seconds += perf_counter() - start
+                rule_stats.calls += 1
+                rule_stats.climbs += self._climbs
+                rule_stats.max_climbs = max(rule_stats.max_climbs, self._climbs)
+                (self._current, self._climbs) = (caller, caller_climbs)
+
+        return timed_action
+
+    def _switch_to_parent_wrapper(self, switch_to_parent):
+        def counted_switch_to_parent(token_group):
+            if self._current is None:
+                self.stats.closing_climbs += 1
+            else:
+                self._climbs += 1
+            return switch_to_parent(token_group)
+
+        return counted_switch_to_parent
+
+    def _token_stream_wrapper(self, token_stream):
+        stats = self.stats
+
+        def timed_token_stream(sql_text, start=0):
+            tokens = token_stream(sql_text, start)
+            while True:
+                start = perf_counter()
+                token = next(tokens, None)
+                stats.lexer_seconds += perf_counter() - start
+                if token is None:
+                    return
+                stats.tokens += 1
+                yield token
+
+        return timed_token_stream
+
+    def _parse_wrapper(self, parse):
+        stats = self.stats
+
+        def timed_parse(sql_text, offset, tokens):
+            statements = parse(sql_text, offset, tokens)
+            while True:
+                start = perf_counter()
+                stmt = next(statements, None)
+                stats.parse_seconds += perf_counter() - start
+                if stmt is None:
+                    return
+                stats.statements += 1
+                yield stmt
+
+        return timed_parse
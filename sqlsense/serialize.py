@@ -0,0 +1,186 @@
+''' Compact binary serialization of parsed Statements, e.g. to cache parse results
+    across processes and restarts.
+
+    The serialized data holds a JSON header and an array of 32 bit integers:
+
+    - header: the source texts, the (source number, offset) of each Statement, the token
+      types (interned, each one once) and the token values which are not the text of the
+      token in its source text (e.g. Whitespace normalized by the lexer)
+    - integers: the nodes of the Statements in preorder, each Statement being the first
+      node of its tree. A node is (child count, ttype number, start, end, value reference):
+      child count is -1 for a token, start and end are relative to the Statement offset.
+      Value reference is -1 when the value is the text from start to end, otherwise end
+      is -1 unless the token does not span the length of its value.
+
+    Statements only reference their source texts, so the texts are stored once
+    however many tokens they have. Datasets and datafields are not serialized,
+    they are extracted again (on demand) from the loaded Statements.
+'''
+import json
+import struct
+import sys
+from array import array
+
+from pygments.token import string_to_tokentype
+
+from sqlsense.sql import Token, TokenGroup
+
+MAGIC = b'SQLS'
+VERSION = 1
+
+# MAGIC, VERSION, length of the header and number of integers
+_PREFIX = struct.Struct('<4sBII')
+_NODE_SIZE = 5
+
+
+def dumps(statements):
+    """ Serializes Statements.
+
+    Arguments:
+        statements {iterable} -- [Statements returned by parse (or parse_file)]
+
+    Returns:
+        [bytes] -- [Serialized Statements]
+    """
+    sources = {}
+    statement_sources = []
+    ttypes = {}
+    values = {}
+    ints = array('i')
+    for stmt in statements:
+        source = stmt._source
+        if id(source) not in sources:
+            sources[id(source)] = (len(sources), source)
+        statement_sources.append((sources[id(source)][0], stmt._offset))
+        offset = stmt._offset
+        # The tokens are mostly in the order their positions were added (see
+        # SqlStatement._add_position), the positions by token are the fallback
+        (positioned, starts, ends) = (stmt._tokens, stmt._starts, stmt._ends)
+        (number, positions) = (0, None)
+        stack = [iter((stmt, ))]
+        while stack:
+            token = next(stack[-1], None)
+            if token is None:
+                stack.pop()
+                continue
+            ttype_number = ttypes.get(token._ttype)
+            if ttype_number is None:
+                ttype_number = ttypes[token._ttype] = len(ttypes)
+            if isinstance(token, TokenGroup):
+                ints.extend((len(token._token_list), ttype_number, 0, 0, -1))
+                stack.append(iter(token._token_list))
+                continue
+            value = token._value
+            if number < len(positioned) and positioned[number] is token:
+                (start, end) = (starts[number], ends[number])
+                number += 1
+            else:
+                if positions is None:
+                    positions = stmt._token_positions()
+                (start, end) = positions.get(token, (-1, -1))
+            if end == start + len(value):
+                # The end is only kept for the tokens which do not span the length of their value
+                end = -1
+            if start >= 0 and end < 0 and source is not None and source.startswith(value, offset + start):
+                (end, value_reference) = (start + len(value), -1)
+            else:
+                value_reference = values.get(value)
+                if value_reference is None:
+                    value_reference = values[value] = len(values)
+            ints.extend((-1, ttype_number, start, end, value_reference))
+    header = json.dumps({
+        'sources': [source for _, source in sorted(sources.values(), key=lambda item: item[0])],
+        'statements': statement_sources,
+        'ttypes': [str(ttype) if ttype is not None else None for ttype in ttypes],
+        'values': list(values),
+    }, separators=(',', ':')).encode('utf-8')
+    if sys.byteorder != 'little':
+        ints.byteswap()
+    return _PREFIX.pack(MAGIC, VERSION, len(header), len(ints)) + header + ints.tobytes()
+
+
+def loads(data, parser):
+    """ Rebuilds the Statements serialized by dumps.
+
+    Arguments:
+        data {bytes} -- [Serialized Statements]
+        parser {SqlParser} -- [Parser creating the Statements, as it does when parsing]
+
+    Raises:
+        ValueError -- [The data is not serialized Statements of this version]
+
+    Returns:
+        [list] -- [Statements, those with the same source text share it]
+    """
+    data = memoryview(data)
+    if len(data) < _PREFIX.size:
+        raise ValueError('Not serialized statements')
+    (magic, version, header_length, int_count) = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not serialized statements')
+    if version != VERSION:
+        raise ValueError('Statements serialized with version {0}, expected version {1}'.format(version, VERSION))
+    start = _PREFIX.size + header_length
+    if len(data) != start + 4 * int_count:
+        raise ValueError('Serialized statements are truncated')
+    header = json.loads(bytes(data[_PREFIX.size:start]).decode('utf-8'))
+    sources = header['sources']
+    ttypes = [string_to_tokentype(name) if name is not None else None for name in header['ttypes']]
+    values = header['values']
+    ints = array('i')
+    ints.frombytes(data[start:])
+    if sys.byteorder != 'little':
+        ints.byteswap()
+
+    statements = []
+    ints = iter(ints)
+    nodes = zip(*((ints, ) * _NODE_SIZE))
+    # Tokens are created without calling __init__, the nodes hold the values of their slots
+    new_token = Token.__new__
+    new_token_group = TokenGroup.__new__
+    for (source_number, offset) in header['statements']:
+        source = sources[source_number]
+        (child_count, ttype_number, _, _, _) = next(nodes)
+        stmt = parser._new_sql_statement(source, offset)
+        stmt.ttype = ttypes[ttype_number]
+        # Same as stmt._add_position for each token, in the order the tokens were parsed
+        (add_token, add_start, add_end) = (stmt._tokens.append, stmt._starts.append, stmt._ends.append)
+        (token_list, parent, remaining) = (stmt._token_list, stmt, child_count)
+        # Token Groups being filled, along with their number of children left to add
+        stack = []
+        while True:
+            while not remaining:
+                if not stack:
+                    break
+                (token_list, parent, remaining) = stack.pop()
+            else:
+                remaining -= 1
+                (child_count, ttype_number, start, end, value_reference) = next(nodes)
+                if child_count < 0:
+                    token = new_token(Token)
+                    token._ttype = ttypes[ttype_number]
+                    token._parent = parent
+                    if value_reference < 0:
+                        token._value = source[offset + start:offset + end]
+                    else:
+                        token._value = values[value_reference]
+                        if start >= 0 and end < 0:
+                            end = start + len(token._value)
+                    if start >= 0:
+                        add_token(token)
+                        add_start(start)
+                        add_end(end)
+                    token_list.append(token)
+                else:
+                    token = new_token_group(TokenGroup)
+                    token._ttype = ttypes[ttype_number]
+                    token._parent = parent
+                    token._value = token._value_without_comment = None
+                    token._token_list = []
+                    token_list.append(token)
+                    stack.append((token_list, parent, remaining))
+                    (token_list, parent, remaining) = (token._token_list, token, child_count)
+                continue
+            break
+        statements.append(stmt)
+    return statements
@@ -0,0 +1,253 @@
+''' Splits SQL text, possibly received in chunks, into statement texts
+    without lexing it, so that large SQL files can be parsed statement
+    by statement with bounded memory.
+'''
+import re
+
+_IDENTIFIER_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$')
+_DOLLAR_QUOTE_RE = re.compile(r'\$(?:[^\W\d]\w*)?\$')
+_PARTIAL_DOLLAR_QUOTE_RE = re.compile(r'\$(?:[^\W\d]\w*)?\Z')
+_BLOCK_COMMENT_RE = re.compile(r'/\*|\*/')
+# COPY ... FROM stdin statement, after the comments preceding it
+_COPY_FROM_STDIN_RE = re.compile(r'(?:\s|--[^\n]*\n|/\*.*?\*/)*COPY\b.*\bFROM\s+STDIN\b', re.IGNORECASE | re.DOTALL)
+# State while in the data following COPY ... FROM stdin, up to the \. line
+_COPY_DATA = 'COPY'
+# Characters kept before the scan position, _scan looks behind that many characters
+_LOOKBEHIND = 2
+
+
+class StatementSplitter(object):
+    """ Splits SQL text into statements at the end marker.
+        End markers within string literals, quoted identifiers, comments
+        and (optionally) dollar quoted strings are ignored. Optionally, the
+        data following COPY ... FROM stdin statements (as in pg_dump files),
+        up to the \\. line, is skipped.
+
+        Text is supplied with feed(), one chunk at a time, and complete
+        statements are yielded as soon as their end marker is found. Only
+        the text of the current (incomplete) statement is kept in memory.
+    """
+
+    def __init__(self, end_marker=';', dollar_quotes=False, copy_data=False):
+        self._special_chars_re = re.compile('[{0}\'"$/-]'.format(re.escape(end_marker)))
+        self._end_marker = end_marker
+        self._dollar_quotes = dollar_quotes
+        self._copy_data = copy_data
+        self._parts = []        # Text of the current statement scanned before the buffer
+        self._buffer = ''
+        self._position = 0      # Position in buffer up to which the text has been scanned
+        self._state = None      # None, "'", "E'", '"', '--', '/*', the dollar quote tag or _COPY_DATA
+        self._comment_depth = 0
+        self._offset = 0        # Offset of the buffer within the complete text
+
+    @property
+    def offset(self):
+        ''' Offset (within the complete text) of the statement that is currently being read.
+        '''
+        return self._offset
+
+    def feed(self, text):
+        """ Adds the text to the buffer and yields the statements completed by it.
+
+        Arguments:
+            text {str} -- [Next chunk of SQL text]
+
+        Yields:
+            [str] -- [Statement text including the end marker. The text between two
+            end markers (whitespace, comments) is part of the following statement.]
+        """
+        scanned = self._position - _LOOKBEHIND
+        if scanned > 0:
+            # The scanned text is moved out of the buffer, so that the text of a long
+            # statement is not copied again with each chunk
+            if self._state == _COPY_DATA:
+                self._offset += scanned
+            else:
+                self._parts.append(self._buffer[:scanned])
+            self._buffer = self._buffer[scanned:]
+            self._position -= scanned
+        self._buffer = self._buffer + text
+        return self._split(final=False)
+
+    def close(self):
+        """ Yields the remaining text, if it is not blank, as the last statement.
+        """
+        for statement_text in self._split(final=True):
+            yield statement_text
+        statement_text = ''.join(self._parts) + self._buffer
+        if statement_text.strip():
+            yield statement_text
+        self._offset += len(statement_text)
+        self._parts = []
+        self._buffer = ''
+        self._position = 0
+        self._state = None
+
+    def _split(self, final):
+        statement_start = 0
+        while True:
+            copy_data = self._state == _COPY_DATA
+            end = self._scan(final)
+            if end is None:
+                break
+            statement_text = self._buffer[statement_start:end]
+            if self._parts:
+                statement_text = ''.join(self._parts) + statement_text
+                self._parts = []
+            statement_start = end
+            if copy_data:
+                # Not SQL, skipped
+                self._offset += len(statement_text)
+                continue
+            yield statement_text
+            self._offset += len(statement_text)
+            if self._copy_data and _COPY_FROM_STDIN_RE.match(statement_text):
+                self._state = _COPY_DATA
+        self._buffer = self._buffer[statement_start:]
+        self._position -= statement_start
+
+    def _scan(self, final):
+        """ Scans the buffer from the current position until an end marker is found.
+
+        Returns:
+            [int] -- [Position after the end marker, None if more text is required]
+        """
+        buffer = self._buffer
+        length = len(buffer)
+        position = self._position
+        while position < length:
+            state = self._state
+            if state is None:
+                match = self._special_chars_re.search(buffer, position)
+                if match is None:
+                    position = length
+                    break
+                position = match.start()
+                char = buffer[position]
+                if buffer.startswith(self._end_marker, position):
+                    self._position = position + len(self._end_marker)
+                    return self._position
+                elif char == "'":
+                    escapes = (position > 0 and buffer[position - 1] in 'eE' and
+                               (position == 1 or buffer[position - 2] not in _IDENTIFIER_CHARS))
+                    self._state = "E'" if escapes else "'"
+                    position += 1
+                elif char == '"':
+                    self._state = '"'
+                    position += 1
+                elif char in '-/':
+                    if position + 1 == length and not final:
+                        # Can not say if this is a comment until the next chunk arrives
+                        break
+                    if buffer.startswith('--', position):
+                        self._state = '--'
+                        position += 2
+                    elif buffer.startswith('/*', position):
+                        self._state = '/*'
+                        self._comment_depth = 1
+                        position += 2
+                    else:
+                        position += 1
+                elif char == '$':
+                    if not self._dollar_quotes or (position > 0 and buffer[position - 1] in _IDENTIFIER_CHARS):
+                        position += 1
+                        continue
+                    match = _DOLLAR_QUOTE_RE.match(buffer, position)
+                    if match is not None:
+                        self._state = match.group()
+                        position = match.end()
+                    elif not final and _PARTIAL_DOLLAR_QUOTE_RE.match(buffer, position):
+                        # Dollar quote tag continues in the next chunk
+                        break
+                    else:
+                        position += 1
+                else:
+                    position += 1
+            elif state in ("'", '"', "E'"):
+                quote = state[-1]
+                end = buffer.find(quote, position)
+                if state == "E'":
+                    backslash = buffer.find('\\', position, length if end < 0 else end)
+                    if backslash >= 0:
+                        if backslash + 1 == length:
+                            position = backslash
+                            break
+                        position = backslash + 2
+                        continue
+                if end < 0:
+                    position = length
+                elif end + 1 == length and not final:
+                    # A doubled quote is an escaped quote, wait for the next chunk
+                    position = end
+                    break
+                elif buffer.startswith(quote, end + 1):
+                    position = end + 2
+                else:
+                    self._state = None
+                    position = end + 1
+            elif state == '--':
+                end = buffer.find('\n', position)
+                if end < 0:
+                    position = length
+                else:
+                    self._state = None
+                    position = end + 1
+            elif state == '/*':
+                match = _BLOCK_COMMENT_RE.search(buffer, position)
+                if match is None:
+                    # Keep the last character, it may be the start of '*/' or '/*'
+                    position = max(position, length - 1)
+                    break
+                self._comment_depth += 1 if match.group() == '/*' else -1
+                position = match.end()
+                if self._comment_depth == 0:
+                    self._state = None
+            elif state == _COPY_DATA:
+                # The data ends with a line holding only \.
+                end = buffer.find('\n\\.', position)
+                if end < 0:
+                    if final:
+                        self._state = None
+                        self._position = length
+                        return length
+                    # Keep the text that may be the start of the \. line
+                    position = max(position, length - 2)
+                    break
+                after = end + 3
+                if buffer.startswith('\r\n', after):
+                    after += 1
+                if after < length and buffer[after] == '\n':
+                    self._state = None
+                    self._position = after + 1
+                    return self._position
+                elif after == length or (after + 1 == length and buffer[after] == '\r'):
+                    if final:
+                        self._state = None
+                        self._position = length
+                        return length
+                    # Can not say if the line ends here until the next chunk arrives
+                    position = end
+                    break
+                position = end + 1
+            else:
+                # Dollar quoted string, state is the tag
+                end = buffer.find(state, position)
+                if end < 0:
+                    # Keep the text that may be the start of the closing tag
+                    position = max(position, length - len(state) + 1)
+                    break
+                self._state = None
+                position = end + len(state)
+        self._position = position
+        return None
+
+
+def split_statements(chunks, end_marker=';', dollar_quotes=False, copy_data=False):
+    """ Generator yielding the statement texts from an iterable of text chunks.
+    """
+    splitter = StatementSplitter(end_marker=end_marker, dollar_quotes=dollar_quotes, copy_data=copy_data)
+    for chunk in chunks:
+        for statement_text in splitter.feed(chunk):
+            yield statement_text
+    for statement_text in splitter.close():
+        yield statement_text
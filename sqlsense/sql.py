@@ -2,14 +2,108 @@
     Parts of the code are similar to / copied from sqlparse: https://github.com/andialbrecht/sqlparse
 '''
 
+from array import array
+from collections import namedtuple
+from collections.abc import MutableMapping
+
 from pygments.token import Comment, Whitespace
 
 import sqlsense.tokens as ST
+from sqlsense.tokens import ANCESTOR_BITS, CODES
+
+# Masks of the token types suppressed by value() and flatten() (see sqlsense.tokens.bit)
+_COMMENT_BIT = ST.bit(Comment)
+_WHITESPACE_BIT = ST.bit(Whitespace)
+# Datasets, datafields and (datafield, dataset) links of a Statement
+Lineage = namedtuple('Lineage', ['datasets', 'datafields', 'links'])
+# Marks the fields of a LineageRecord deleted by key
+_DELETED = object()
+
+
+class LineageRecord(MutableMapping):
+    ''' Base class of the dataset and datafield records of a Statement. The fields of a
+        record are its attributes, the ones listed in _fields can also be read and
+        replaced by key as in a dict, e.g. dict(record) is the same as the dict the
+        record used to be. A field may be a property computing its value on first access.
+
+        Other keys can be added and the keys deleted as in a dict, they are kept in
+        a dict of their own (created only then). Deleting a field by key does not
+        change its attribute. copy() returns a dict, but a record is not a dict instance.
+    '''
+    __slots__ = ('_extra', )
+    # Sub classes set _field_values to attrgetter(*_fields)
+    _fields = ()
+    _field_values = None
+
+    def __getitem__(self, key):
+        extra = self._extra
+        if key in self._fields:
+            if extra is not None and extra.get(key) is _DELETED:
+                raise KeyError(key)
+            return getattr(self, key)
+        if extra is None or extra.get(key, _DELETED) is _DELETED:
+            raise KeyError(key)
+        return extra[key]
+
+    def __setitem__(self, key, value):
+        extra = self._extra
+        if key in self._fields:
+            setattr(self, key, value)
+            if extra is not None:
+                extra.pop(key, None)
+        else:
+            if extra is None:
+                extra = self._extra = {}
+            extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._fields:
+            if self._extra is None:
+                self._extra = {}
+            # Deleted fields are marked in the dict of the other keys
+            self._extra[key] = _DELETED
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key):
+        extra = self._extra
+        if extra is None:
+            return key in self._fields
+        return extra.get(key, _DELETED) is not _DELETED or (key in self._fields and key not in extra)
+
+    def __iter__(self):
+        extra = self._extra
+        if extra is None:
+            return iter(self._fields)
+        return (key for key in self._fields + tuple(extra) if key in self)
+
+    def __len__(self):
+        if self._extra is None:
+            return len(self._fields)
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(self._asdict())
+
+    def copy(self):
+        ''' Returns the record as a dict, same as dict.copy() did when the records were dicts.
+        '''
+        return self._asdict()
+
+    def _asdict(self):
+        ''' Returns the record as a dict, same as dict(record) but faster (as namedtuple._asdict).
+        '''
+        if self._extra is None:
+            return dict(zip(self._fields, self._field_values(self)))
+        return {key: self[key] for key in self}
 
 
 class Token(object):
     ''' Token class
     '''
+    __slots__ = ('_ttype', '_value', '_parent')
 
     def __init__(self, ttype, value):
         self._ttype = ttype
@@ -34,31 +128,89 @@ class Token(object):
     def parent(self):
         return self._parent
 
+    @property
+    def span(self):
+        ''' (start, end) position of the token within the source text of its Statement,
+            None if the position is not known (e.g. the token is not part of a Statement).
+        '''
+        stmt = self.statement()
+        return stmt._span(self, self) if stmt is not None else None
+
+    def statement(self):
+        ''' Returns the Statement the token belongs to, None if it is not part of a Statement.
+        '''
+        root = self
+        while root._parent is not None:
+            root = root._parent
+        return root if isinstance(root, SqlStatement) else None
+
+    def source_value(self):
+        ''' Returns the text of the token as it appears in the source text,
+            without the normalization done by the lexer. Returns None if the
+            position of the token is not known.
+        '''
+        span = self.span
+        if span is None:
+            return None
+        source = self.statement()._source
+        return source[span[0]:span[1]] if source is not None else None
+
     def value(self, suppress_comment=False):
         ''' Implement the function in Child class as per requirement
         '''
-        if not (suppress_comment and self._ttype in Comment):
-            return self._value
-        else:
+        if suppress_comment and ANCESTOR_BITS[CODES[self._ttype]] & _COMMENT_BIT:
             return ''
+        return self._value
+
+    def set_value(self, value):
+        ''' Replaces the value of the token and invalidates the
+            cached values of the Token Groups it belongs to.
+        '''
+        self._value = value
+        if self._parent is not None:
+            self._parent._invalidate_value()
+
+    def extend(self, token):
+        ''' Appends the value of the supplied (immediately following) token
+            to this token, e.g. for the parts of a String literal. The position
+            of this token then ends where the supplied token ends.
+        '''
+        stmt = self.statement()
+        if stmt is not None:
+            stmt._extend_position(self, token)
+        self.set_value(self.value() + token.value())
 
     def match_type_value(self, other):
         return (self._ttype == other.ttype and self.value() == other.value()) if (type(other) == type(self)) else False
 
+    def is_(self, ttype, value):
+        ''' Same as match_type_value(Token(ttype, value)), without creating a Token to compare with.
+        '''
+        return self._value == value and self._ttype == ttype
+
     def flatten(self, suppress_whitespace=False, suppress_comment=False):
-        if not((suppress_comment and self._ttype in Comment) or (suppress_whitespace and self._ttype in Whitespace)):
+        mask = (_COMMENT_BIT if suppress_comment else 0) | (_WHITESPACE_BIT if suppress_whitespace else 0)
+        if not (mask and ANCESTOR_BITS[CODES[self._ttype]] & mask):
             yield self
 
 
 class TokenGroup(Token):
     ''' Token Group class
     '''
+    __slots__ = ('_token_list', '_value_without_comment')
+
+    # Token types generated by get_identifiers, the second set only within a Select Clause
+    _identifier_ttypes = frozenset((ST.Identifier, ST.Function, ST.SubQuery))
+    _select_identifier_ttypes = frozenset((ST.ComputedIdentifier, ST.SelectConstantIdentifier))
 
     def __init__(self, token_list=None, ttype=None):
         self._token_list = token_list or []
         # for all token in token list, set myself as the parent
         [setattr(token, '_parent', self) for token in self._token_list]
         super().__init__(ttype, None)
+        # _value (and _value_without_comment) hold the cached value of the group
+        # and are reset to None whenever the tokens within the group change
+        self._value_without_comment = None
 
     @property
     def token_list(self):
@@ -68,27 +220,104 @@ class TokenGroup(Token):
     def token_count(self):
         return len(self._token_list)
 
+    @property
+    def span(self):
+        ''' (start, end) position of the token group within the source text of its Statement,
+            None if the position is not known.
+        '''
+        first_token = self
+        while isinstance(first_token, TokenGroup) and first_token._token_list:
+            first_token = first_token._token_list[0]
+        last_token = self
+        while isinstance(last_token, TokenGroup) and last_token._token_list:
+            last_token = last_token._token_list[-1]
+        stmt = self.statement()
+        return stmt._span(first_token, last_token) if stmt is not None else None
+
     def value(self, suppress_comment=False):
-        return ''.join(token.value(suppress_comment) for token in self._token_list)
+        value = self._value_without_comment if suppress_comment else self._value
+        if value is None:
+            value = self._compute_value(suppress_comment)
+        return value
+
+    def _compute_value(self, suppress_comment):
+        ''' Computes (and caches) the value of the group and of the groups within it
+            which do not have a cached value, children first, using an explicit stack.
+        '''
+        stack = [(self, iter(self._token_list), [])]
+        while True:
+            (token_group, tokens, values) = stack[-1]
+            for token in tokens:
+                if isinstance(token, TokenGroup):
+                    value = token._value_without_comment if suppress_comment else token._value
+                    if value is None:
+                        stack.append((token, iter(token._token_list), []))
+                        break
+                    values.append(value)
+                else:
+                    values.append(token.value(suppress_comment))
+            else:
+                stack.pop()
+                value = ''.join(values)
+                if suppress_comment:
+                    token_group._value_without_comment = value
+                else:
+                    token_group._value = value
+                if not stack:
+                    return value
+                stack[-1][2].append(value)
+
+    def _invalidate_value(self):
+        ''' Resets the cached value of the group and of all its parents.
+            A group is cached only if all its children are cached, so we can
+            stop at the first parent which does not have a cached value.
+        '''
+        token_group = self
+        while token_group is not None and (token_group._value is not None or
+                                           token_group._value_without_comment is not None):
+            token_group._value = None
+            token_group._value_without_comment = None
+            token_group = token_group._parent
 
     def flatten(self, suppress_whitespace=False, suppress_comment=False):
         ''' Generator yielding ungrouped tokens.
-            This method is recursively called for all child tokens.
+            Nested token groups are walked using an explicit stack, not recursively.
         '''
-        for token in self._token_list:
-            for item in token.flatten(suppress_whitespace, suppress_comment):
-                yield item
-
-    def get_identifiers(self, tokengroup_set=set()):
+        mask = (_COMMENT_BIT if suppress_comment else 0) | (_WHITESPACE_BIT if suppress_whitespace else 0)
+        stack = [iter(self._token_list)]
+        while stack:
+            for token in stack[-1]:
+                if isinstance(token, TokenGroup):
+                    stack.append(iter(token._token_list))
+                    break
+                if not (mask and ANCESTOR_BITS[CODES[token._ttype]] & mask):
+                    yield token
+            else:
+                stack.pop()
+
+    def get_identifiers(self, tokengroup_set=None):
         """ Generates Identifiers in the SQL Statement.
+            Nested token groups are walked using an explicit stack, not recursively.
+
+        Keyword Arguments:
+            tokengroup_set {set} -- [Additional token group types to generate] (default: {None})
         """
-        for token in self._token_list:
-            if (token._ttype in {ST.Identifier, ST.Function, ST.SubQuery}.union(tokengroup_set) or
-                    (token._ttype in (ST.ComputedIdentifier, ST.SelectConstantIdentifier) and token.parent._ttype == ST.SelectClause)):
-                yield token
-            if isinstance(token, TokenGroup):
-                for item in token.get_identifiers(tokengroup_set):
-                    yield item
+        identifier_ttypes = self._identifier_ttypes
+        if tokengroup_set:
+            identifier_ttypes = identifier_ttypes.union(tokengroup_set)
+        select_identifier_ttypes = self._select_identifier_ttypes
+        stack = [iter(self._token_list)]
+        while stack:
+            for token in stack[-1]:
+                ttype = token._ttype
+                if (ttype in identifier_ttypes or
+                        (ttype in select_identifier_ttypes and token._parent._ttype == ST.SelectClause)):
+                    yield token
+                if isinstance(token, TokenGroup):
+                    stack.append(iter(token._token_list))
+                    break
+            else:
+                stack.pop()
 
     def append(self, token):
         ''' Appends the supplied token to the token list and 
@@ -97,6 +326,7 @@ class TokenGroup(Token):
         if isinstance(token, Token) or isinstance(token, TokenGroup):
             token._parent = self
             self._token_list.append(token)
+            self._invalidate_value()
 
     def insert(self, index, token):
         ''' Inserts the supplied token to the token list at the given index position and 
@@ -105,13 +335,15 @@ class TokenGroup(Token):
         if isinstance(token, Token) or isinstance(token, TokenGroup):
             token._parent = self
             self._token_list.insert(index, token)
+            self._invalidate_value()
 
     def pop_whitespace_token(self):
         ''' Pop the last token if it is a Whitespace and return True
             else return False
         '''
-        if self._token_list[-1].match_type_value(Token(Whitespace, ' ')):
-            self._token_list = self._token_list[:-1]
+        if self._token_list[-1].is_(Whitespace, ' '):
+            self._token_list.pop()
+            self._invalidate_value()
             return True
         else:
             return False
@@ -125,6 +357,10 @@ class TokenGroup(Token):
                 return True
         return False
 
+    def is_(self, ttype, value):
+        # A Token Group never matches a Token (see match_type_value)
+        return False
+
     def token_before(self, next_token_index=None, suppress_whitespace=True, suppress_comment=True):
         token_list_index = next_token_index if (
             next_token_index and next_token_index < self.token_count) else self.token_count
@@ -164,21 +400,95 @@ class TokenGroup(Token):
         """
         if token_list_end_index_excluded is None:
             token_list_end_index_excluded = self.token_count
-        items_to_remove = token_list_end_index_excluded - token_list_start_index_included
-        new_grp = TokenGroup(ttype=ttype)
-        for i in range(items_to_remove):
-            new_grp.append(self._token_list.pop(
-                token_list_start_index_included))
-        self.insert(token_list_start_index_included, new_grp)
+        new_grp = TokenGroup(self._token_list[token_list_start_index_included:token_list_end_index_excluded], ttype)
+        new_grp._parent = self
+        # Replace the subset of tokens by the new group in a single step
+        self._token_list[token_list_start_index_included:token_list_end_index_excluded] = [new_grp]
+        self._invalidate_value()
         return new_grp
 
 
 class SqlStatement(TokenGroup):
     ''' SQL Statement class
     '''
+    __slots__ = ('_source', '_offset', '_tokens', '_starts', '_ends', '_token_numbers')
 
     def __init__(self, token_list=None, ttype=None):
         super().__init__(token_list=token_list, ttype=ttype)
+        self._source = None
+        self._offset = 0
+        # Positions of the tokens within the source text, relative to the offset:
+        # the tokens in the order they were added (see _add_position) and, at the
+        # same index, their start and end as 32 bit integers instead of int objects.
+        self._tokens = []
+        self._starts = array('i')
+        self._ends = array('i')
+        # Index of each token within _tokens, built when a position is first looked up
+        self._token_numbers = None
+
+    @property
+    def source(self):
+        ''' The SQL text the Statement was parsed from (shared by all the
+            Statements parsed from the same text).
+        '''
+        return self._source
+
+    @property
+    def offset(self):
+        ''' Offset of the Statement within the source text.
+            Token positions are stored relative to this offset.
+        '''
+        return self._offset
+
+    def _add_position(self, token, start, end):
+        ''' Records the position of a token of the Statement, relative to its offset.
+        '''
+        self._tokens.append(token)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._token_numbers = None
+
+    def _span(self, first_token, last_token):
+        ''' Returns the (start, end) position within the source text from the start of the
+            first token to the end of the last token, None if a position is not known.
+        '''
+        token_numbers = self._token_numbers
+        if token_numbers is None:
+            token_numbers = self._token_numbers = {token: number for number, token in enumerate(self._tokens)}
+        first = token_numbers.get(first_token)
+        last = token_numbers.get(last_token)
+        if first is None or last is None:
+            return None
+        return (self._offset + self._starts[first], self._offset + self._ends[last])
+
+    def _token_positions(self):
+        ''' Returns the (start, end) position of each token, relative to the offset, by token.
+            Used to walk the whole tree, the dict is not kept (unlike the one of _span).
+        '''
+        return dict(zip(self._tokens, zip(self._starts, self._ends)))
+
+    def _extend_position(self, token, next_token):
+        ''' Moves the end of the token position to the end of the next token (see
+            Token.extend) and drops the position of the next token, which is no longer
+            a token of the Statement. The tokens are looked up from the last one added.
+        '''
+        tokens = self._tokens
+        (number, next_number) = (None, None)
+        for index in range(len(tokens) - 1, -1, -1):
+            if tokens[index] is next_token:
+                next_number = index
+            elif tokens[index] is token:
+                number = index
+                break
+        if number is not None and next_number is not None:
+            self._ends[number] = self._ends[next_number]
+            del tokens[next_number]
+            del self._starts[next_number]
+            del self._ends[next_number]
+            self._token_numbers = None
 
     def datasets_involved(self):
         return NotImplementedError
+
+    def extract_lineage(self):
+        raise NotImplementedError
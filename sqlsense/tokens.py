@@ -1,5 +1,7 @@
-''' Defines the Statement and TokenGroup token types.
+''' Defines the Statement and TokenGroup token types, and the integer codes of the token types.
 '''
+import threading
+
 from pygments.token import Token
 
 ## Statement ###################################################################
@@ -140,3 +142,70 @@ QualifierOperator = Token.Operator.QualifierOperator
 
 AliasName = Token.Name.AliasName
 QualifierName = Token.Name.QualifierName
+
+## Integer codes ###############################################################
+# Each token type gets a small integer code, in the order the types are registered
+# (code 0 is None), and the bitset of the codes of the type and of its parent types.
+# "ttype is a subtype of Comment" is then a bitmask operation instead of a walk up
+# the type tuple:  ANCESTOR_BITS[CODES[ttype]] & bit(Comment)
+# Token types created later (e.g. by another lexer) are registered when first looked up,
+# under a lock as the parsers may run in threads (sqlsense.aio).
+
+_CODES_LOCK = threading.RLock()  # Reentrant: registering a type registers its parent
+
+
+class _Codes(dict):
+    def __missing__(self, ttype):
+        with _CODES_LOCK:
+            code = self.get(ttype)
+            if code is None:
+                # The parent first: it may not be registered yet, and takes the next code
+                parent_bits = ANCESTOR_BITS[self[ttype.parent]] if ttype.parent is not None else 0
+                code = len(ANCESTOR_BITS)
+                ANCESTOR_BITS.append(parent_bits | 1 << code)
+                self[ttype] = code
+        return code
+
+
+CODES = _Codes({None: 0})
+ANCESTOR_BITS = [1]
+
+
+def bit(*ttypes):
+    """ Returns the mask of the token types, for subtype checks against the ANCESTOR_BITS
+        of a token type (the mask of any of several types is their bitwise or).
+
+    Arguments:
+        ttypes {_TokenType} -- [Token types]
+
+    Returns:
+        [int] -- [Bitmask]
+    """
+    mask = 0
+    for ttype in ttypes:
+        mask |= 1 << CODES[ttype]
+    return mask
+
+
+def is_subtype(ttype, mask):
+    """ Returns True if the token type is one of the types of the mask (see bit), or a
+        subtype of one of them. Same as ttype in Comment for mask = bit(Comment).
+    """
+    return ANCESTOR_BITS[CODES[ttype]] & mask != 0
+
+
+def register(ttype):
+    """ Registers a token type and its subtypes, sorted by name so that the codes do not
+        depend on the order the subtypes were created.
+    """
+    CODES[ttype]
+    for subtype in sorted(ttype.subtypes):
+        register(subtype)
+
+
+# The types most checked against get the lowest codes (and the smallest masks)
+for _ttype in (Token, Token.Text, Token.Text.Whitespace, Token.Comment, Token.Literal,
+               Token.Literal.Number, Token.Literal.String, Token.Keyword, Token.Name,
+               Token.Punctuation, Token.Operator):
+    CODES[_ttype]
+register(Token)
@@ -0,0 +1,33 @@
+import unittest
+
+from pygments import token as T
+from pygments.lexers.sql import PostgresLexer
+
+from sqlsense.filter import float_to_integer_token, float_to_punctuation_token, text_to_whitespace_token
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.sql_corpus import sql_texts
+
+
+class TokenRewriteFilterTest(unittest.TestCase):
+
+    def test_001_same_tokens_as_filter_chain(self):
+        lexer = PostgresLexer(stripall=True)
+        lexer.add_filter(text_to_whitespace_token())
+        lexer.add_filter(float_to_integer_token())
+        lexer.add_filter(float_to_punctuation_token())
+        parser = PostgresParser(lexer_object=PostgresLexer)
+        for sql_text in sql_texts() + ['SELECT t.a, 1.5, 2, .5, 3e4, 1 . 2 FROM t\n\t\r\n  WHERE x > 10']:
+            assert list(parser._lexer.get_tokens(sql_text)) == list(lexer.get_tokens(sql_text))
+
+    def test_002_dialect_rewrites(self):
+        class UpperNameParser(PostgresParser):
+            def _set_token_rewrites_(self):
+                rewrites = super()._set_token_rewrites_()
+                rewrites[T.Name] = lambda ttype, value: (ttype, value.upper())
+                return rewrites
+
+        tokens = list(UpperNameParser()._lexer.get_tokens('select a.b,\n 1.\n'))
+        assert tokens == [
+            (T.Keyword, 'select'), (T.Whitespace, ' '), (T.Name, 'A'), (T.Punctuation, '.'), (T.Name, 'B'),
+            (T.Punctuation, ','), (T.Whitespace, ' '), (T.Number.Float, '1.'), (T.Whitespace, ' '),
+        ]
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import unittest
+
+from sqlsense.batch import lineage_records
+from sqlsense.postgres.postgres_aio import AsyncPostgresParser
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+SQL_TEXT = 'SELECT a.x, b.y FROM a JOIN b ON a.id = b.id;\n-- c; d\nSELECT upper(e.f) AS g FROM sch.e e WHERE e.h > 1;\n'
+
+# Released by the tests to let BlockedParser parse
+_unblocked = threading.Event()
+
+
+class BlockedParser(PostgresParser):
+    def parse(self, sql_text):
+        _unblocked.wait(5)
+        return super().parse(sql_text)
+
+
+class BytesReader(object):
+    def __init__(self, data):
+        self._data = data
+
+    async def read(self, size):
+        await asyncio.sleep(0)
+        (chunk, self._data) = (self._data[:size], self._data[size:])
+        return chunk
+
+
+class AsyncParserTest(unittest.TestCase):
+
+    def test_001_parse(self):
+        p = PostgresParser()
+        expected = [stmt.value() for stmt in p.parse(SQL_TEXT)]
+
+        async def run(async_parser):
+            async with async_parser:
+                statements = await async_parser.parse(SQL_TEXT)
+                assert [stmt.value() for stmt in statements] == expected
+                records = await async_parser.parse(SQL_TEXT, lineage=True)
+                assert records == [lineage_records(stmt) for stmt in p.parse(SQL_TEXT)]
+
+        asyncio.run(run(AsyncPostgresParser(workers=2)))
+        asyncio.run(run(AsyncPostgresParser(workers=2, processes=True)))
+
+        deep = 'SELECT s.a FROM ' + '(SELECT s.a FROM ' * 150 + 't s' + ') s' * 150
+
+        async def run_deep(async_parser):
+            async with async_parser:
+                statements = await async_parser.parse(deep)
+                assert [stmt.value() for stmt in statements] == [stmt.value() for stmt in p.parse(deep)]
+
+        asyncio.run(run_deep(AsyncPostgresParser(workers=1, processes=True)))
+
+    def test_002_parse_stream(self):
+        sql_text = SQL_TEXT * 20 + 'SELECT é FROM ü'
+        expected = [stmt.value().strip() for stmt in PostgresParser().parse(sql_text)]
+
+        async def run():
+            async with AsyncPostgresParser(workers=2, max_pending=3) as async_parser:
+                data = sql_text.encode('utf-8')
+                statements = [stmt async for stmt in async_parser.parse_stream(BytesReader(data), chunk_size=7)]
+                assert [stmt.value().strip() for stmt in statements] == expected
+                records = [record async for record in async_parser.parse_stream(BytesReader(data), lineage=True)]
+                datafield = records[-2]['datafields'][0]
+                assert sql_text[datafield['defined_at'][0]:datafield['defined_at'][1]] == 'upper(e.f) AS g'
+
+        asyncio.run(run())
+
+    def test_003_backpressure_timeout(self):
+        async def run():
+            async with AsyncPostgresParser(BlockedParser, workers=1, max_pending=1) as async_parser:
+                first = asyncio.ensure_future(async_parser.parse('SELECT a FROM b'))
+                await asyncio.sleep(0.05)
+                # Waiting for the slot held by the first SQL text
+                with self.assertRaises(asyncio.TimeoutError):
+                    await async_parser.parse('SELECT c FROM d', timeout=0.05)
+                _unblocked.set()
+                assert [stmt.value().strip() for stmt in await first] == ['SELECT a FROM b']
+                statements = await async_parser.parse('SELECT c FROM d', timeout=5)
+                assert [stmt.value().strip() for stmt in statements] == ['SELECT c FROM d']
+
+        try:
+            asyncio.run(run())
+        finally:
+            _unblocked.set()
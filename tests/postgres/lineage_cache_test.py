@@ -0,0 +1,95 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+
+from sqlsense.batch import lineage_records
+from sqlsense.lineage_cache import LineageCache, rules_version
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.sql_corpus import sql_texts
+
+
+class NoAliasParser(PostgresParser):
+    def _set_rules_(self):
+        rules_dict = super()._set_rules_()
+        rules_dict['Token.Keyword.AS'] = (None, None)
+        return rules_dict
+
+
+class LineageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'lineage.db')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_001_same_as_parse(self):
+        p = PostgresParser()
+        corpus = sql_texts()
+        with LineageCache(self.path, PostgresParser()) as cache:
+            for sql_text in corpus:
+                assert cache.lineage(sql_text) == [lineage_records(stmt) for stmt in p.parse(sql_text)]
+            misses = cache.cache_info().misses
+            assert misses > 0 and cache.cache_info().currsize > 0
+        # Another instance (e.g. in another process) finds every statement
+        with LineageCache(self.path, PostgresParser()) as cache:
+            for sql_text in corpus:
+                moved = 'SELECT x FROM y;\n\n  ' + sql_text + '\n'
+                assert cache.lineage(moved) == [lineage_records(stmt) for stmt in p.parse(moved)]
+            # SELECT x FROM y is found from the second SQL text on
+            assert cache.cache_info()[:2] == (misses + len(corpus) - 1, 1)
+            # Statements found in the cache are not parsed
+            cache._parser.parse = None
+            for sql_text in corpus:
+                assert cache.lineage(sql_text) == [lineage_records(stmt) for stmt in p.parse(sql_text)]
+
+    def test_002_version(self):
+        assert rules_version(PostgresParser()) == rules_version(PostgresParser())
+        assert rules_version(NoAliasParser()) != rules_version(PostgresParser())
+        with LineageCache(self.path, PostgresParser()) as cache:
+            cache.lineage('SELECT a AS b FROM c')
+        with LineageCache(self.path, NoAliasParser()) as cache:
+            cache.lineage('SELECT a AS b FROM c')
+            assert cache.cache_info().misses == 1
+
+    def test_003_eviction(self):
+        with LineageCache(self.path, PostgresParser(), max_bytes=2000) as cache:
+            for i in range(50):
+                cache.lineage('SELECT t.a{0}, t.b FROM s.t{0} t WHERE t.c = {0}'.format(i))
+            info = cache.cache_info()
+            assert 0 < info.currsize <= 2000
+            assert info.currsize == sum(size for (size, ) in cache._connection.execute('SELECT size FROM lineage'))
+            cache.lineage('SELECT t.a49, t.b FROM s.t49 t WHERE t.c = 49')
+            cache.lineage('SELECT t.a0, t.b FROM s.t0 t WHERE t.c = 0')
+            assert cache.cache_info().hits == 1
+            cache.cache_clear()
+            assert cache.cache_info() == (0, 0, 2000, 0)
+
+    def test_004_version_module_source(self):
+        # Module level code the parser depends on is part of the stamp, not only its methods
+        module_text = (
+            'from sqlsense.postgres.postgres_parser import PostgresParser\n'
+            'SKIPPED_NAMES = frozenset({0!r})\n\n\n'
+            'class ModuleParser(PostgresParser):\n'
+            '    def _process_name(self, stmt, token_group, token, tokengroup_set):\n'
+            '        if token.value() in SKIPPED_NAMES:\n'
+            '            return token_group\n'
+            '        return super()._process_name(stmt, token_group, token, tokengroup_set)\n')
+        module_path = os.path.join(self.tmp_dir.name, 'version_test_parser.py')
+        sys.path.insert(0, self.tmp_dir.name)
+        try:
+            versions = []
+            for names in ((), ('b', ), ()):
+                with open(module_path, 'w') as module_file:
+                    module_file.write(module_text.format(names))
+                importlib.invalidate_caches()
+                module = importlib.import_module('version_test_parser')
+                module = importlib.reload(module)
+                versions.append(rules_version(module.ModuleParser()))
+            assert versions[0] != versions[1] and versions[0] == versions[2]
+        finally:
+            sys.path.remove(self.tmp_dir.name)
+            sys.modules.pop('version_test_parser', None)
@@ -0,0 +1,95 @@
+import pickle
+import sys
+import unittest
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+class LineageTest(unittest.TestCase):
+
+    def test_001_datafield_datasets(self):
+        p = PostgresParser()
+        sql_text = '''SELECT a.x, u.y, s.z, t.w, q.v FROM sch.t a JOIN u a ON a.id = u.id
+                      JOIN (SELECT 1) s ON s.k = a.k'''
+        stmt = list(p.parse(sql_text))[0]
+        datafields = [(df['datafield'], df['dataset_alias'], df['dataset'], df['schema'], df['dataset_type'])
+                      for df in stmt.datafields_involved() if df['type'] == 'Datafield']
+        assert datafields == [
+            # First dataset with the alias
+            ('x', 'a', 't', 'sch', 'Dataset'),
+            # Dataset name, when no dataset has the alias
+            ('y', 'u', 'u', None, 'Dataset'),
+            ('z', 's', '(SELECT 1) ', None, 'Sub Query'),
+            ('w', 't', 't', 'sch', 'Dataset'),
+            ('v', 'q', None, None, None),
+            ('id', 'a', 't', 'sch', 'Dataset'),
+            ('id', 'u', 'u', None, 'Dataset'),
+            ('k', 's', '(SELECT 1) ', None, 'Sub Query'),
+            ('k', 'a', 't', 'sch', 'Dataset'),
+        ]
+
+    def test_002_extract_lineage(self):
+        p = PostgresParser()
+        stmt = list(p.parse('SELECT d.a, e.b, c FROM org.d JOIN e x ON d.id = x.id'))[0]
+        lineage = stmt.extract_lineage()
+        assert lineage.datasets is stmt.datasets_involved()
+        assert lineage.datafields is stmt.datafields_involved()
+        assert [(df['defined_at'].value(), ds['defined_at'].value()) for df, ds in lineage.links] == [
+            ('d.a', 'org.d'), ('e.b', 'e x'), ('d.id', 'org.d'), ('x.id', 'e x')]
+        assert stmt.extract_lineage() == lineage
+
+    def test_003_lineage_records(self):
+        p = PostgresParser()
+        stmt = list(p.parse('SELECT upper(s.n) AS un, s.m FROM (SELECT n, m FROM t) s'))[0]
+        dataset = stmt.datasets_involved()[0]
+        (function_field, _, datafield) = stmt.datafields_involved()[:3]
+        assert dataset.alias == dataset['alias'] == 's'
+        # Texts are computed on first access
+        assert function_field._datafield is None
+        assert function_field.datafield == function_field['datafield'] == 'upper(s.n) '
+        assert datafield.dataset == '(SELECT n, m FROM t) ' and datafield.dataset_type == 'Sub Query'
+        other_dataset = list(p.parse('SELECT x FROM (SELECT 1) q'))[0].datasets_involved()[0]
+        assert other_dataset._dataset is None
+        assert other_dataset.dataset == '(SELECT 1) '
+        # Same as the dicts the records used to be
+        assert list(datafield) == ['type', 'datafield', 'datafield_alias', 'dataset', 'schema', 'catalog',
+                                   'dataset_type', 'dataset_alias', 'rw_ind', 'defined_at']
+        assert dict(datafield)['datafield'] == 'm' and datafield.get('rw_ind') == 'r'
+        assert repr(dataset) == repr(dict(dataset))
+        assert datafield._asdict() == dict(datafield)
+        assert dataset == dict(dataset)
+        datafield['dataset'] = 't'
+        assert datafield.dataset == 't'
+        with self.assertRaises(KeyError):
+            datafield['_datafield']
+        # Other keys, deleting keys and the dict methods, as with the dicts
+        copy = datafield.copy()
+        assert type(copy) is dict and copy == datafield
+        datafield['lineage_id'] = 7
+        datafield.update(note='n', schema='s')
+        assert datafield['lineage_id'] == 7 and datafield.schema == 's'
+        assert datafield.pop('note') == 'n' and datafield.setdefault('note', 'm') == 'm'
+        assert datafield.pop('catalog') is None and 'catalog' not in datafield
+        with self.assertRaises(KeyError):
+            datafield['catalog']
+        expected = dict(copy, dataset='t', schema='s', lineage_id=7, note='m')
+        del expected['catalog']
+        assert dict(datafield) == datafield._asdict() == expected and len(datafield) == len(expected)
+        assert list(datafield)[-2:] == ['lineage_id', 'note']
+        datafield['catalog'] = 'c'
+        assert datafield['catalog'] == 'c' and len(datafield) == len(expected) + 1
+        assert copy['schema'] is None and 'lineage_id' not in copy
+
+    def test_004_pickled_statement(self):
+        # Unpickled token types may be copies of the Pygments ones
+        # Pickle recurses through the tree, the limit is restored for the other tests
+        old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(old_limit, 10000))
+        self.addCleanup(sys.setrecursionlimit, old_limit)
+        p = PostgresParser()
+        sql_text = "SELECT a+b, upper(c) AS u, 1 AS one, d.e FROM d WHERE d.f = 'x'"
+        stmt = list(p.parse(sql_text))[0]
+        expected = [(df['type'], df['datafield']) for df in stmt.datafields_involved()]
+        assert {'Computed Field', 'Constant Field'} <= set(df_type for (df_type, _) in expected)
+        loaded = pickle.loads(pickle.dumps(list(p.parse(sql_text))[0]))
+        assert [(df['type'], df['datafield']) for df in loaded.datafields_involved()] == expected
@@ -0,0 +1,83 @@
+import re
+import unittest
+
+from sqlsense.cache import ParseCache, shape
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.sql_corpus import sql_texts
+
+
+def tokens(statements):
+    result = []
+    for stmt in statements:
+        result.append((stmt.ttype, stmt.offset, stmt.value()))
+        result.extend((tk.ttype, tk.value(), tk.span) for tk in stmt.flatten())
+    return result
+
+
+def lineage(statements):
+    def plain(record):
+        return dict(record, defined_at=record['defined_at'].span)
+    return [([plain(ds) for ds in stmt.datasets_involved()], [plain(df) for df in stmt.datafields_involved()])
+            for stmt in statements]
+
+
+def change_literals(sql_text):
+    # Other literal values (of another length) and another layout
+    sql_text = re.sub(r"'([^']*)'", r"'\1\1 x'", sql_text)
+    return re.sub(r'(?<![\w.])([0-9]+)', r'\g<1>7', sql_text)
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def assert_same_as_parse(self, cache, sql_text):
+        expected = list(PostgresParser().parse(sql_text))
+        actual = list(cache.parse(sql_text))
+        assert tokens(actual) == tokens(expected)
+        assert lineage(actual) == lineage(expected)
+        assert all(stmt.source is sql_text for stmt in actual)
+
+    def test_001_shape(self):
+        (key, literals) = shape("SELECT a FROM b  WHERE c = 'x''y' AND d > 1.5 AND e IN (2, 3) -- 4")
+        assert key == "SELECT a FROM b WHERE c = \x00s AND d > \x00f AND e IN (\x00i, \x00i) -- 4"
+        assert [value for _, _, value in literals] == ["'x''y'", '1.5', '2', '3']
+        assert shape('SELECT t1.c2, "x 1" FROM $$ 5 $$')[1] == []
+
+    def test_002_cached_parse(self):
+        cache = ParseCache(PostgresParser())
+        corpus = sql_texts()
+        for sql_text in corpus:
+            self.assert_same_as_parse(cache, sql_text)
+        for sql_text in corpus:
+            # Same layout, other literals
+            self.assert_same_as_parse(cache, change_literals(sql_text))
+            # Other layout (indentation)
+            self.assert_same_as_parse(cache, change_literals(re.sub(r'\n\s*', '\n\t', sql_text)))
+        info = cache.cache_info()
+        assert info.misses == len(corpus)
+        assert info.hits == 2 * len(corpus)
+
+    def test_003_cached_statements_are_independent(self):
+        cache = ParseCache(PostgresParser())
+        first = list(cache.parse('SELECT a FROM b WHERE c = 1; SELECT d FROM e'))
+        second = list(cache.parse('SELECT a FROM b WHERE c = 22; SELECT d FROM e'))
+        first[0].token_list.pop()
+        third = list(cache.parse('SELECT a FROM b WHERE c = 333; SELECT d FROM e'))
+        assert [stmt.value() for stmt in second] == ['SELECT a FROM b WHERE c = 22;', ' SELECT d FROM e ']
+        assert [stmt.value() for stmt in third] == ['SELECT a FROM b WHERE c = 333;', ' SELECT d FROM e ']
+        assert second[1].offset == 29 and third[1].offset == 30
+
+    def test_004_not_cached(self):
+        cache = ParseCache(PostgresParser())
+        # The lexer does not make a single token of the E string literal
+        for value in ("E'a'", "E'bb'"):
+            self.assert_same_as_parse(cache, "SELECT a FROM b WHERE c = {0}".format(value))
+        assert cache.cache_info().hits == 0
+
+    def test_005_eviction(self):
+        cache = ParseCache(PostgresParser(), maxsize=2)
+        for table in ('a', 'b', 'a', 'c', 'b'):
+            list(cache.parse('SELECT x FROM {0} WHERE y = 1'.format(table)))
+        info = cache.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+        cache.cache_clear()
+        assert cache.cache_info() == (0, 0, 2, 0)
@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import unittest
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+from sqlsense.splitter import split_statements
+
+SQL_TEXT = '''
+-- header comment; not a statement end
+SELECT 'a;b', 'it''s; here', E'x\\';y', "odd;name" FROM t1;
+/* block ; /* nested ; */ comment */ SELECT $$ body ; $$, $fn$ a $$ ; $fn$, $1 FROM t2;
+SELECT a.x - 1 FROM t3 a WHERE a.y = 'z';
+SELECT 1'''
+
+
+def _chunks(text, chunk_size):
+    return (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+
+
+class ParseFileTest(unittest.TestCase):
+
+    def test_001_split_statements(self):
+        expected = [
+            "\n-- header comment; not a statement end\nSELECT 'a;b', 'it''s; here', E'x\\';y', \"odd;name\" FROM t1;",
+            "\n/* block ; /* nested ; */ comment */ SELECT $$ body ; $$, $fn$ a $$ ; $fn$, $1 FROM t2;",
+            "\nSELECT a.x - 1 FROM t3 a WHERE a.y = 'z';",
+            "\nSELECT 1",
+        ]
+        for chunk_size in range(1, len(SQL_TEXT) + 1):
+            assert list(split_statements(_chunks(SQL_TEXT, chunk_size), dollar_quotes=True)) == expected, chunk_size
+        assert list(split_statements([SQL_TEXT + ';\n  \n'], dollar_quotes=True)) == expected[:-1] + ['\nSELECT 1;']
+
+    def test_002_parse_file(self):
+        p = PostgresParser()
+        sql_text = 'SELECT a.x, b.y\nFROM a JOIN b ON a.id = b.id;\nSELECT c FROM d WHERE e = 1;\n' * 50
+        expected = [(stmt.value().strip(), [ds['dataset'] for ds in stmt.datasets_involved()])
+                    for stmt in p.parse(sql_text)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'dump.sql')
+            with open(path, 'w', encoding='utf-8') as sql_file:
+                sql_file.write(sql_text)
+            for source in (path, io.StringIO(sql_text), io.BytesIO(sql_text.encode('utf-8'))):
+                actual = [(stmt.value().strip(), [ds['dataset'] for ds in stmt.datasets_involved()])
+                          for stmt in p.parse_file(source, chunk_size=7)]
+                assert actual == expected
+
+    def test_003_multibyte_chunks(self):
+        p = PostgresParser()
+        sql_text = "SELECT 'é', nom FROM élèves;\nSELECT '€' FROM t;\n"
+        expected = [stmt.value().strip() for stmt in p.parse(sql_text)]
+        for chunk_size in (1, 2, 3):
+            actual = [stmt.value().strip() for stmt in p.parse_file(io.BytesIO(sql_text.encode('utf-8')),
+                                                                   chunk_size=chunk_size)]
+            assert actual == expected, chunk_size
+
+    def test_004_copy_data(self):
+        dump = ('--\n-- Data for Name: people; Type: TABLE DATA\n--\n\n'
+                'COPY public.people (id, name) FROM stdin;\n'
+                "1\tO'Brien; \"x\n2\t$$ -- /*\n3\t\\\\.x\n\\.\n\n"
+                'SELECT id FROM public.people;\n'
+                'copy t from STDIN;\r\n\\.\r\n'
+                "SELECT 'a';\n"
+                'COPY t FROM stdin;\n4\tlast')
+        expected = [
+            '--\n-- Data for Name: people; Type: TABLE DATA\n--\n\nCOPY public.people (id, name) FROM stdin;',
+            '\nSELECT id FROM public.people;',
+            '\ncopy t from STDIN;',
+            "SELECT 'a';",
+            '\nCOPY t FROM stdin;',
+        ]
+        for chunk_size in range(1, len(dump) + 1):
+            assert list(split_statements(_chunks(dump, chunk_size), dollar_quotes=True, copy_data=True)) == expected
+        # Offsets account for the data skipped
+        splitter = PostgresParser()._get_statement_splitter()
+        for chunk in _chunks(dump, 5):
+            for statement_text in splitter.feed(chunk):
+                assert dump[splitter.offset:splitter.offset + len(statement_text)] == statement_text
+        assert list(splitter.close()) == [] and splitter.offset == len(dump)
@@ -0,0 +1,56 @@
+import unittest
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.sql_corpus import sql_texts
+
+
+class ParseManyTest(unittest.TestCase):
+
+    sql_texts = [
+        'SELECT a.x, b.y FROM a JOIN b ON a.id = b.id;',
+        '',
+        'SELECT c FROM d;\n  SELECT upper(e.f) AS g FROM sch.e e WHERE e.h > 1',
+        '-- only a comment',
+    ] * 5
+
+    def test_001_parse_many_trees(self):
+        p = PostgresParser()
+        expected = [[stmt.value() for stmt in p.parse(sql_text)] for sql_text in self.sql_texts]
+        for workers in (1, 2):
+            actual = [[stmt.value().strip() for stmt in statements]
+                      for statements in p.parse_many(self.sql_texts, workers=workers, chunksize=3)]
+            assert actual == [[value.strip() for value in values] for values in expected]
+
+    def test_002_parse_many_lineage(self):
+        p = PostgresParser()
+        results = list(p.parse_many(self.sql_texts, workers=2, chunksize=2, lineage=True))
+        assert len(results) == len(self.sql_texts)
+        third = results[2]
+        assert [[ds['dataset'] for ds in stmt['datasets']] for stmt in third] == [['d'], ['e']]
+        datafield = third[1]['datafields'][0]
+        assert datafield['datafield_alias'] == 'g'
+        sql_text = self.sql_texts[2]
+        assert sql_text[datafield['defined_at'][0]:datafield['defined_at'][1]] == 'upper(e.f) AS g'
+        assert results[1] == [] and results[3] == []
+
+    def test_003_parse_many_same_lineage(self):
+        # The trees parsed by the worker processes hold the same token types,
+        # the computed and constant fields of their select clauses are found
+        p = PostgresParser()
+        corpus = sql_texts()
+        expected = [[[df['datafield'] for df in stmt.datafields_involved()] for stmt in p.parse(sql_text)]
+                    for sql_text in corpus]
+        actual = [[[df['datafield'] for df in stmt.datafields_involved()] for stmt in statements]
+                  for statements in p.parse_many(corpus, workers=2, chunksize=8)]
+        assert actual == expected
+
+    def test_004_parse_many_deep_nesting(self):
+        # Too deep for pickle to send the tree back from a worker process
+        depth = 150
+        deep = 'SELECT s.a FROM ' + '(SELECT s.a FROM ' * depth + 't s' + ') s' * depth
+        sql_texts = ['SELECT a FROM b;', deep, 'SELECT c FROM d;']
+        p = PostgresParser()
+        expected = [[stmt.value() for stmt in p.parse(sql_text)] for sql_text in sql_texts]
+        results = list(p.parse_many(sql_texts, workers=2, chunksize=1))
+        assert [[stmt.value() for stmt in statements] for statements in results] == expected
+        assert 't' in [ds['dataset'] for ds in results[1][0].datasets_involved()]
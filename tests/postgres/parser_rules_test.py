@@ -0,0 +1,38 @@
+import unittest
+
+from pygments import token as T
+
+from sqlsense.parser import _NO_RULE
+from sqlsense.postgres.postgres_parser import PostgresParser
+
+
+def _string_rule_key(ttype, value):
+    # Rule key as it used to be built for every token in SqlParser.parse
+    if ttype == T.Keyword:
+        return 'Token.Keyword.{0}'.format(value.upper())
+    elif ttype in T.Number:
+        return 'Token.Literal.Number'
+    elif ttype in T.String:
+        return 'Token.Literal.String'
+    return str(ttype)
+
+
+class ParserRulesTest(unittest.TestCase):
+
+    def test_001_compiled_rules_match_string_keys(self):
+        p = PostgresParser()
+        sql_text = '''
+        --- some comment
+        WITH RECURSIVE t(n) AS (SELECT 1 UNION ALL SELECT n+1 FROM t WHERE n < 100)
+        SELECT DISTINCT upper(a.c) AS c, 'x' 'y', 20.5, p.*, name, CASE WHEN a.x IS NOT NULL THEN 1 ELSE 0 END
+        FROM abc.a_table AS a LEFT OUTER JOIN long_table_name p ON a.z = p.z
+        WHERE a.x BETWEEN 1 AND 2 OR a.y NOT LIKE 'a%' AND NOT EXISTS (SELECT 1 FROM t)
+        GROUP BY 1 HAVING count(*) > 1 ORDER BY 2 LIMIT 10;
+        '''
+        for ttype, value in p._lexer.get_tokens(sql_text):
+            expected = p._parse_rules.get(_string_rule_key(ttype, value), _NO_RULE)
+            if ttype is T.Keyword:
+                actual = p._keyword_rules.get(value.upper(), _NO_RULE)
+            else:
+                actual = p._ttype_rules.get(ttype) or p._resolve_ttype_rule(ttype)
+            assert actual == expected, '{0}: <{1}>'.format(ttype, value)
@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from pygments.lexers.sql import PostgresLexer
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.sql_corpus import sql_texts
+
+
+class PostgresFastLexerTest(unittest.TestCase):
+
+    sql_texts = [
+        "SELECT E'a\\'b', U&'d\\0061t', U&\"x\"\"y\", e'', 'it''s', \"q\"\"id\" FROM t",
+        "SELECT bit varying(3), character  varying, double\nprecision, timestamp with time zone, with time zone x",
+        "WITH cte AS (SELECT 1) SELECT ſelect, Key, ın FROM İnteger",
+        "a+-- comment\n b /* c /* nested */ still */ d*/e ::int $1 $$x$$ $tag$ y $tag$ $ :var :'v' :\"w\" : ;",
+        "SELECT 1.2.3, .5e10, 1e, 1E+5, 12abc, t.c, 1. ..",
+        "CREATE FUNCTION f() RETURNS int AS $$ BEGIN RETURN 1; END $$ LANGUAGE plpgsql;",
+        "DO $body$ BEGIN PERFORM 1; END $body$;",
+        "SELECT é, café, \\, § FROM 'unterminated",
+        "SELECT /* unterminated * /",
+        "SELECT \"unterminated",
+        "SELECT\r\n\t1\r2",
+    ]
+
+    def random_sql_texts(self, count):
+        rnd = random.Random(0)
+        parts = list("abeEuU&'\"$:;.,()[]{}+-*/<>=~!@#%^|`?019 \n_ſé") + [
+            'select ', 'with ', 'time ', 'zone ', 'bit ', 'varying', '$$', '/*', '*/', '--']
+        return [''.join(rnd.choice(parts) for _ in range(rnd.randint(1, 40))) for _ in range(count)]
+
+    def test_001_same_tokens_as_pygments(self):
+        fast_lexer = PostgresParser()._lexer
+        pygments_lexer = PostgresParser(lexer_object=PostgresLexer)._lexer
+        assert not isinstance(fast_lexer, PostgresLexer)
+        for sql_text in sql_texts() + self.sql_texts + self.random_sql_texts(1000):
+            assert list(fast_lexer.get_tokens(sql_text)) == list(pygments_lexer.get_tokens(sql_text)), sql_text
@@ -0,0 +1,56 @@
+import io
+import json
+import unittest
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+from sqlsense.profiling import CSV_FIELDS
+from tests.postgres.parse_cache_test import tokens
+from tests.postgres.sql_corpus import sql_texts
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def test_001_same_statements(self):
+        parser = PostgresParser()
+        stats = parser.enable_profiling()
+        for sql_text in sql_texts():
+            assert tokens(parser.parse(sql_text)) == tokens(PostgresParser().parse(sql_text))
+        assert stats.statements > 0 and stats.tokens > 0
+        assert 0 < stats.lexer_seconds < stats.parse_seconds
+        assert stats.rules['Token.Keyword.SELECT'].calls > 0
+        assert stats.rules['Token.Keyword.FROM'].climbs > 0
+        assert sum(rule_stats.calls for rule_stats in stats.rules.values()) <= stats.tokens
+
+    def test_002_disable(self):
+        parser = PostgresParser()
+        stats = parser.enable_profiling()
+        list(parser.parse('SELECT a FROM (SELECT b FROM c'))
+        assert stats.statements == 1
+        assert stats.closing_climbs > 0
+        assert parser.disable_profiling() is stats
+        assert parser.disable_profiling() is None
+        assert '_parse_tokens' not in vars(parser)
+        list(parser.parse('SELECT a FROM b'))
+        assert stats.statements == 1
+        assert stats.rules['Token.Keyword.SELECT'].calls == 2
+
+    def test_003_export(self):
+        parser = PostgresParser()
+        stats = parser.enable_profiling()
+        list(parser.parse('SELECT a, b FROM c WHERE d = 1; SELECT e FROM f'))
+        exported = json.loads(json.dumps(stats.as_dict()))
+        assert exported['statements'] == 2
+        assert exported['rules']['Token.Keyword.SELECT']['calls'] == 2
+        csv_file = io.StringIO()
+        stats.write_csv(csv_file)
+        lines = csv_file.getvalue().splitlines()
+        assert lines[0] == ','.join(CSV_FIELDS)
+        assert len(lines) == len(stats.rules) + 1
+        dump_file = io.StringIO()
+        stats.dump(dump_file, limit=3)
+        assert len(dump_file.getvalue().splitlines()) == 5
+        stats.reset()
+        assert stats.statements == 0
+        assert all(rule_stats.calls == 0 for rule_stats in stats.rules.values())
+        list(parser.parse('SELECT a FROM b'))
+        assert stats.rules['Token.Keyword.SELECT'].calls == 1
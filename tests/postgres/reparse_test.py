@@ -0,0 +1,70 @@
+import random
+import unittest
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+from tests.postgres.parse_cache_test import lineage, tokens
+from tests.postgres.sql_corpus import sql_texts
+
+# End marker within a dollar quoted string
+DOLLAR_QUOTED = 'SELECT $body$ x; y $body$ AS a FROM b'
+
+
+def script():
+    return ';\n'.join(sql_texts()[::2] + [DOLLAR_QUOTED, 'SELECT a FROM b']) + ';\n  SELECT c FROM d '
+
+
+class ReparseTest(unittest.TestCase):
+
+    def assert_same_as_parse(self, statements, offset, deleted_length, inserted_text):
+        source = statements[0].source
+        sql_text = source[:offset] + inserted_text + source[offset + deleted_length:]
+        expected = list(PostgresParser().parse(sql_text))
+        actual = PostgresParser().reparse(statements, offset, deleted_length, inserted_text)
+        assert tokens(actual) == tokens(expected)
+        assert lineage(actual) == lineage(expected)
+        assert all(stmt.source == sql_text for stmt in actual)
+        return actual
+
+    def test_001_reuse(self):
+        statements = list(PostgresParser().parse(
+            'SELECT a FROM b;\nSELECT c FROM d;\nSELECT e.f FROM e;\nSELECT g FROM h'))
+        lineages = lineage(statements)
+        # Edit within the second statement
+        offset = statements[0].source.index('FROM d')
+        actual = self.assert_same_as_parse(statements, offset, 4, 'FROM  ')
+        assert actual[0] is statements[0]
+        assert actual[1] is not statements[1]
+        assert actual[2:] == statements[2:] and all(new is old for new, old in zip(actual[2:], statements[2:]))
+        assert lineage(actual[2:]) == [(
+            [dict(ds, defined_at=(ds['defined_at'][0] + 2, ds['defined_at'][1] + 2)) for ds in datasets],
+            [dict(df, defined_at=(df['defined_at'][0] + 2, df['defined_at'][1] + 2)) for df in datafields])
+            for datasets, datafields in lineages[2:]]
+        # A statement is inserted before the third one
+        actual = self.assert_same_as_parse(actual, actual[2].offset, 0, '\nSELECT x FROM y;')
+        assert len(actual) == 5 and actual[3:] == statements[2:]
+
+    def test_002_random_edits(self):
+        rand = random.Random(20)
+        inserts = ['', ' ', 'x', ';', "'", '"', '(', ')', ', y', ' AND z = 1', '-- c\n', '/*', '$$', ' LANGUAGE sql ']
+        statements = list(PostgresParser().parse(script()))
+        for _ in range(200):
+            # Successive edits, each one on the statements of the previous one
+            source = statements[0].source
+            offset = rand.randrange(len(source) + 1)
+            deleted_length = min(rand.choice((0, 0, 1, 5)), len(source) - offset)
+            inserted_text = rand.choice(inserts)
+            try:
+                if not list(PostgresParser().parse(source[:offset] + inserted_text + source[offset + deleted_length:])):
+                    continue
+            except Exception:
+                # Not supported by the parser
+                continue
+            statements = self.assert_same_as_parse(statements, offset, deleted_length, inserted_text)
+
+    def test_003_invalid(self):
+        parser = PostgresParser()
+        with self.assertRaises(ValueError):
+            parser.reparse([], 0, 0, 'SELECT a FROM b')
+        statements = list(parser.parse('SELECT a FROM b'))
+        with self.assertRaises(ValueError):
+            parser.reparse(statements, 10, 10, '')
@@ -0,0 +1,42 @@
+import io
+import unittest
+
+from sqlsense.postgres.postgres_parser import PostgresParser
+from sqlsense.serialize import dumps, loads
+from sqlsense.sql import TokenGroup
+from tests.postgres.parse_cache_test import lineage, tokens
+from tests.postgres.sql_corpus import sql_texts
+
+
+def parents_are_set(token_group):
+    return all(token._parent is token_group and (not isinstance(token, TokenGroup) or parents_are_set(token))
+               for token in token_group.token_list)
+
+
+class SerializeTest(unittest.TestCase):
+
+    def test_001_round_trip(self):
+        p = PostgresParser()
+        for sql_text in sql_texts():
+            statements = list(p.parse(sql_text))
+            actual = loads(dumps(statements), p)
+            assert tokens(actual) == tokens(statements)
+            assert lineage(actual) == lineage(statements)
+            assert all(stmt.source == sql_text and stmt.source is actual[0].source for stmt in actual)
+            assert all(parents_are_set(stmt) for stmt in actual)
+
+    def test_002_sources(self):
+        p = PostgresParser()
+        statements = list(p.parse_file(io.StringIO('SELECT a FROM b;\n  SELECT c   FROM d')))
+        statements.extend(p.parse('SELECT e FROM f'))
+        actual = loads(dumps(statements), p)
+        assert [stmt.source for stmt in actual] == [stmt.source for stmt in statements]
+        assert tokens(actual) == tokens(statements)
+        assert loads(dumps([]), p) == []
+
+    def test_003_invalid(self):
+        p = PostgresParser()
+        data = dumps(p.parse('SELECT a FROM b'))
+        for invalid in (b'', b'SQLT' + data[4:], data[:4] + b'\x02' + data[5:], data[:-1]):
+            with self.assertRaises(ValueError):
+                loads(invalid, p)
@@ -0,0 +1,20 @@
+''' SQL texts of the select statement tests, shared by the tests that compare
+    the result of two ways of parsing the same SQL text.
+'''
+import ast
+import os
+
+
+def sql_texts():
+    """ Returns the sql_text strings assigned in select_statement_test.py, in order.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'select_statement_test.py')
+    with open(path) as test_file:
+        tree = ast.parse(test_file.read())
+    texts = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == 'sql_text' for target in node.targets):
+            if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                texts.append((node.lineno, node.value.value))
+    return [text for _, text in sorted(texts)]
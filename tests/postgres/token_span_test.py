@@ -0,0 +1,78 @@
+import copy
+import unittest
+
+from pygments import token as T
+
+import sqlsense.tokens as ST
+from sqlsense.postgres.postgres_parser import PostgresParser
+from sqlsense.sql import TokenGroup
+
+
+class TokenSpanTest(unittest.TestCase):
+
+    def test_001_token_and_group_spans(self):
+        p = PostgresParser()
+        sql_text = '''
+        SELECT upper(a.c)   AS c,\r\n  'x' 'y'
+        FROM abc.a_table a;
+          SELECT 1;'''
+        stmts = [x for x in p.parse(sql_text)]
+        assert len(stmts) == 2
+        for stmt in stmts:
+            for token in stmt.flatten():
+                start, end = token.span
+                assert sql_text[start:end] == token.source_value()
+                if token.ttype in T.Whitespace:
+                    assert token.source_value().strip() == ''
+                else:
+                    assert token.source_value().replace('\r\n', '\n') == token.value()
+        identifiers = [token for token in stmts[0].get_identifiers()]
+        assert [token.source_value() for token in identifiers] == [
+            'upper(a.c)   AS c', 'a.c', "'x' 'y'", 'abc.a_table a']
+        constant = stmts[0].token_list[0].token_list[-1]
+        assert constant.ttype == ST.SelectConstantIdentifier
+        assert constant.source_value() == "'x' 'y'"
+        # The parts of the merged String literals are not tokens of the Statement any more
+        assert len(stmts[0]._tokens) == sum(1 for _ in stmts[0].flatten())
+        assert stmts[0].source_value() == sql_text[sql_text.index('SELECT'):sql_text.index(';') + 1]
+        assert stmts[1].offset == sql_text.index(';') + 1
+        assert stmts[1].source_value() == '\n          SELECT 1;'
+        assert stmts[1].token_list[-1].span == (len(sql_text) - 1, len(sql_text))
+
+    def test_002_positions_kept_by_statement(self):
+        p = PostgresParser()
+        sql_text = "SELECT upper(a.col_1) AS c FROM abc.a_table a;\n\tSELECT 'x', b.col_2 FROM t"
+        stmts = [x for x in p.parse(sql_text)]
+        name = stmts[0].token_list[0].token_list[-1].token_list[0]
+        assert name.value() == 'upper' and name.span == (7, 12)
+        # The positions are kept by the Statement, not by each token
+        assert len(stmts[0]._starts) == len(stmts[0]._ends) == sum(1 for _ in stmts[0].flatten())
+        for stmt in stmts:
+            for token in stmt.flatten():
+                if token.ttype not in T.Whitespace:
+                    assert token.value() == token.source_value()
+        assert stmts[0].value() == sql_text[:sql_text.index(';') + 1]
+        assert stmts[1].value().strip() == "SELECT 'x', b.col_2 FROM t"
+        name.set_value('lower')
+        assert name.value() == 'lower' and name.span == (7, 12)
+        assert stmts[0].value().startswith('SELECT lower(a.col_1) ')
+
+    def test_003_tokens_grouped_again(self):
+        p = PostgresParser()
+        stmt = list(p.parse('SELECT alpha, beta FROM gamma'))[0]
+        tokens = list(stmt.flatten())
+        group = TokenGroup(tokens[:2], ST.Identifier)
+        # The tokens now belong to the group, outside of any Statement
+        assert group.value() == 'SELECT ' and str(tokens[1]) == ' ' and repr(tokens[0]) == '[Token:Keyword:SELECT]'
+        assert group.span is None and tokens[0].span is None and tokens[0].source_value() is None
+        assert tokens[2].value() == 'alpha' and tokens[2].span == (7, 12)
+
+    def test_004_copied_token(self):
+        p = PostgresParser()
+        stmt = list(p.parse('SELECT alpha, beta FROM gamma'))[0]
+        token = [token for token in stmt.flatten() if token.value() == 'alpha'][0]
+        detached = copy.copy(token)
+        detached._parent = None
+        assert detached.value() == 'alpha' and str(detached) == 'alpha' and detached.span is None
+        # A copy is not the token the Statement has the position of
+        assert copy.copy(token).span is None and token.span == (7, 12)
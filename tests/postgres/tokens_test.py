@@ -0,0 +1,36 @@
+import pickle
+import unittest
+
+from pygments import token as T
+
+import sqlsense.postgres.postgres_tokens as PT
+import sqlsense.tokens as ST
+
+
+class TokenCodesTest(unittest.TestCase):
+
+    def test_001_subtype(self):
+        ttypes = [None, T.Comment.Single, T.Whitespace, T.Literal.Number.Float, T.Name.Builtin,
+                  ST.RoundBracket, ST.ConditionGroup, PT.WithClause, PT.WithQueryAliasIdentifier]
+        for ttype in ttypes + [T.Name.Created.Later]:
+            for parent in ttypes[1:]:
+                assert ST.is_subtype(ttype, ST.bit(parent)) == (ttype in parent)
+            assert ST.is_subtype(ttype, ST.bit(T.Comment, T.Name)) == (ttype in T.Comment or ttype in T.Name)
+        assert len(set(ST.CODES[ttype] for ttype in ttypes)) == len(ttypes)
+        assert ST.CODES[None] == 0 and ST.CODES[PT.WithClause] < len(ST.ANCESTOR_BITS)
+
+    def test_002_pickle(self):
+        for ttype in (T.Token, T.Keyword, ST.SelectClause, PT.WithClause):
+            copy = pickle.loads(pickle.dumps(ttype))
+            assert copy == ttype and ST.CODES[copy] == ST.CODES[ttype]
+
+    def test_003_lazy_parent(self):
+        # The child is looked up first: its parent is registered on the way, with its own code
+        child = T.Name.Lazy.Parent.Child
+        code = ST.CODES[child]
+        parent = T.Name.Lazy.Parent
+        assert ST.CODES[parent] != code and ST.CODES[T.Name.Lazy] != ST.CODES[parent]
+        assert ST.is_subtype(child, ST.bit(parent)) and ST.is_subtype(child, ST.bit(T.Name.Lazy))
+        assert not ST.is_subtype(parent, ST.bit(child))
+        assert not ST.is_subtype(T.Name.Lazy, ST.bit(parent))
+        assert ST.is_subtype(parent, ST.bit(T.Name)) and not ST.is_subtype(parent, ST.bit(T.Keyword))
@@ -0,0 +1,81 @@
+import unittest
+
+from pygments import token as T
+
+import sqlsense.tokens as ST
+from sqlsense.sql import Token, TokenGroup
+
+
+def get_token(ttype, value):
+    return Token(ttype, value)
+
+
+class TokenGroupTest(unittest.TestCase):
+
+    def test_001_value_cache_invalidation(self):
+        identifier_grp = TokenGroup(ttype=ST.Identifier, token_list=[get_token(T.Name, 'a')])
+        select_clause_grp = TokenGroup(ttype=ST.SelectClause, token_list=[
+            get_token(T.Keyword, 'SELECT'),
+            get_token(T.Comment.Single, '-- c\n'),
+            identifier_grp,
+        ])
+        assert select_clause_grp.value() == 'SELECT-- c\na'
+        assert select_clause_grp.value(True) == 'SELECTa'
+
+        identifier_grp.append(get_token(T.Whitespace, ' '))
+        assert select_clause_grp.value() == 'SELECT-- c\na '
+        assert select_clause_grp.pop_whitespace_token() is False
+        assert identifier_grp.pop_whitespace_token() is True
+        assert select_clause_grp.value(True) == 'SELECTa'
+
+        identifier_grp.insert(0, get_token(ST.QualifierOperator, '.'))
+        identifier_grp.insert(0, get_token(ST.QualifierName, 't'))
+        identifier_grp.token_list[-1].set_value('b')
+        assert select_clause_grp.value() == 'SELECT-- c\nt.b'
+
+        computed_grp = select_clause_grp.merge_into_token_group(ST.ComputedIdentifier, 2)
+        computed_grp.append(get_token(T.Operator, '+'))
+        assert select_clause_grp.value(True) == 'SELECTt.b+'
+        assert computed_grp.value() == 't.b+'
+
+    def test_002_merge_into_token_group(self):
+        tokens = [get_token(T.Name, 'c{0}'.format(i)) for i in range(6)]
+        select_clause_grp = TokenGroup(ttype=ST.SelectClause, token_list=list(tokens))
+        assert select_clause_grp.value() == 'c0c1c2c3c4c5'
+        new_grp = select_clause_grp.merge_into_token_group(ST.ComputedIdentifier, 2, 5)
+        assert select_clause_grp.token_list == tokens[:2] + [new_grp] + tokens[5:]
+        assert new_grp.token_list == tokens[2:5]
+        assert new_grp.parent is select_clause_grp
+        assert all(token.parent is new_grp for token in tokens[2:5])
+        assert select_clause_grp.value() == 'c0c1c2c3c4c5'
+        new_grp.append(get_token(T.Whitespace, ' '))
+        assert select_clause_grp.value() == 'c0c1c2c3c4 c5'
+
+    def test_003_deeply_nested_groups(self):
+        # Deeper than the recursion limit
+        depth = 5000
+        token_group = TokenGroup(ttype=ST.Identifier, token_list=[get_token(T.Name, 'a')])
+        for i in range(depth):
+            token_group = TokenGroup(ttype=ST.SubQuery if i % 2 else ST.RoundBracket, token_list=[
+                get_token(T.Punctuation, '('),
+                token_group,
+                get_token(T.Comment.Single, '--\n'),
+                get_token(T.Punctuation, ')'),
+            ])
+        assert token_group.value(True) == '(' * depth + 'a' + ')' * depth
+        assert token_group.value() == '(' * depth + 'a' + '--\n)' * depth
+        assert len(list(token_group.flatten(suppress_comment=True))) == 2 * depth + 1
+        identifiers = list(token_group.get_identifiers())
+        assert len(identifiers) == depth // 2
+        assert identifiers[0] is token_group.token_list[1].token_list[1]
+        assert identifiers[-1].ttype == ST.Identifier
+
+    def test_004_is(self):
+        keyword = get_token(T.Keyword, 'AS')
+        assert keyword.is_(T.Keyword, 'AS')
+        assert not keyword.is_(T.Keyword, 'as')
+        assert not keyword.is_(T.Name, 'AS')
+        token_group = TokenGroup(ttype=T.Keyword, token_list=[keyword])
+        assert token_group.value() == 'AS'
+        assert not token_group.is_(T.Keyword, 'AS')
+        assert token_group.is_(T.Keyword, 'AS') == token_group.match_type_value(get_token(T.Keyword, 'AS'))